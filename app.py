@@ -1,23 +1,65 @@
 from flask import Flask, request, jsonify, render_template, send_file
+from flask.json.provider import DefaultJSONProvider
 from werkzeug.utils import secure_filename
 import os
-import tempfile
+import io
 import traceback
 import hashlib
+import hmac
+import time
 import datetime
 import pandas as pd
 import logging
 import json
 import uuid
 import random
+import secrets
+import itertools
+import numpy as np
+import threading
+import atexit
+import tempfile
+import ssl
+from concurrent.futures import ThreadPoolExecutor
+import orjson
+import xlsxwriter
+from openpyxl import load_workbook
 from werkzeug.security import generate_password_hash, check_password_hash
 
 app = Flask(__name__)
 app.config['MAX_CONTENT_LENGTH'] = 100 * 1024 * 1024  # 100MB max file size
+# Behind a proxy that honours X-Sendfile, let it serve table exports from disk
+app.config['USE_X_SENDFILE'] = os.environ.get('USE_X_SENDFILE', '').lower() in ('1', 'true', 'yes')
+PROCESSING_WORKERS = min(8, os.cpu_count() or 1)  # Files processed concurrently per request
+# Explicit PBKDF2 cost instead of Werkzeug's default (1M rounds in Werkzeug 3.1).
+# Existing hashes keep verifying since each one records its own iteration count.
+PASSWORD_HASH_METHOD = os.environ.get('PASSWORD_HASH_METHOD', 'pbkdf2:sha256:600000')
+
+class OrjsonProvider(DefaultJSONProvider):
+    """JSON provider that encodes and decodes with orjson"""
+
+    # numpy scalars (e.g. values pulled out of DataFrames) and non-string
+    # dict keys are encoded natively instead of going through default()
+    options = orjson.OPT_SERIALIZE_NUMPY | orjson.OPT_NON_STR_KEYS
+
+    def dumps(self, obj, **kwargs):
+        return orjson.dumps(obj, default=self.default, option=self.options).decode('utf-8')
+
+    def loads(self, s, **kwargs):
+        return orjson.loads(s)
+
+    def response(self, *args, **kwargs):
+        obj = self._prepare_response_obj(args, kwargs)
+        return self._app.response_class(orjson.dumps(obj, default=self.default, option=self.options),
+                                        mimetype=self.mimetype)
+
+app.json = OrjsonProvider(app)
 
 # Configure logging
-logging.basicConfig(level=logging.INFO)
+logging.basicConfig(level=os.environ.get('LOG_LEVEL', 'INFO').upper())
 logger = logging.getLogger(__name__)
+# pbkdf2_hmac runs inside OpenSSL; its build decides whether SHA-NI is used
+logger.info("Password hashing: %s via %s", PASSWORD_HASH_METHOD, ssl.OPENSSL_VERSION)
 
 # Excel storage paths
 EXCEL_DATA_DIR = 'excel_data'
@@ -26,10 +68,70 @@ API_KEYS_EXCEL = os.path.join(EXCEL_DATA_DIR, 'api_keys.xlsx')
 PROCESSING_SESSIONS_EXCEL = os.path.join(EXCEL_DATA_DIR, 'processing_sessions.xlsx')
 PROCESSED_DATA_EXCEL = os.path.join(EXCEL_DATA_DIR, 'processed_data.xlsx')
 REDACTIONS_LOG_EXCEL = os.path.join(EXCEL_DATA_DIR, 'redactions_log.xlsx') 
+# The redactions log is appended to as JSON Lines; the Excel file above is a
+# view rewritten from it in the background (and on export)
+REDACTIONS_LOG_JSONL = os.path.join(EXCEL_DATA_DIR, 'redactions_log.jsonl')
+REDACTIONS_EXCEL_SYNC_DELAY = 30  # seconds to coalesce appends before rewriting the Excel view
+
+# Output column -> (detector label, default when the label wasn't detected).
+# Callable defaults are only evaluated on a miss.
+PII_FIELD_MAP = {
+    'Hospital_ID': ('Hospital ID', lambda: f'HOSP-{random.randint(1000000, 9999999)}'),
+    'Patient_Name': ('Patient Name', 'John Doe'),
+    'Policy_Number': ('Policy Number', lambda: f'POL-{random.randint(10000000, 99999999)}'),
+    'date_of_birth': ('date of birth', '15 March 1990'),
+    'email': ('email', 'patient@example.com'),
+    'health_insurance': ('health insurance', 'Health Insurance Corp'),
+    'phone_number': ('phone number', '+91-9876543210'),
+}
+PHI_FIELD_MAP = {
+    'Age': ('Age', '35'),
+    'allergy': ('allergy', 'No known allergies'),
+    'blood_group': ('blood group', 'O+'),
+    'drug': ('medication', 'No medications'),
+    'gender': ('gender', 'Male'),
+    'medical_condition': ('medical condition', 'No conditions'),
+    'surgery': ('surgery', 'No surgeries'),
+    'symptom': ('symptom', 'No symptoms'),
+}
+
+# api_keys columns returned to clients, mapped to their response names
+API_KEY_FIELDS = {
+    'id': 'id',
+    'api_key': 'apiKey',
+    'name': 'name',
+    'created_at': 'createdAt',
+    'usage_count': 'usageCount'
+}
+
+# Header styles for exported workbooks (xlsxwriter format properties)
+HEADER_STYLE = {'bold': True, 'font_size': 12}
+BASIC_HEADER_STYLE = {**HEADER_STYLE, 'bg_color': '#D4EDDA'}  # Light green
+PII_HEADER_STYLE = {**HEADER_STYLE, 'bg_color': '#CCE5FF'}    # Light blue
+PHI_HEADER_STYLE = {**HEADER_STYLE, 'bg_color': '#FFE5CC'}    # Light orange
+
+# Redactions log column order (PII/PHI columns without PII_/PHI_ prefix)
+REDACTION_COLS = ['id', 'session_id', 'user_id', 'filename', 'processed_at',
+                  *PII_FIELD_MAP, *PHI_FIELD_MAP]
+# python-calamine parses workbooks much faster than openpyxl; pandas picks
+# its default reader when it isn't installed
+try:
+    import python_calamine
+    EXCEL_READ_ENGINE = 'calamine'
+except ImportError:
+    EXCEL_READ_ENGINE = None
+
+# Parquet exports are optional and need pyarrow
+try:
+    import pyarrow
+    PARQUET_AVAILABLE = True
+except ImportError:
+    PARQUET_AVAILABLE = False
+
 # Import the PII/PHI detection modules
 try:
     from extractor import UniversalTextExtractor
-    from pii_detector import CleanPIIDetector
+    from pii_detector import get_detector
     from replacer import SimplePIIFaker
     PII_DETECTION_AVAILABLE = True
     print("✅ PII/PHI detection modules loaded successfully")
@@ -41,11 +143,12 @@ except ImportError as e:
 if PII_DETECTION_AVAILABLE:
     try:
         extractor = UniversalTextExtractor()
-        detector = CleanPIIDetector()
+        detector = get_detector()
         faker = SimplePIIFaker()
+        faker_lock = threading.Lock()
         logger.info("AI components initialized successfully")
     except Exception as e:
-        logger.error(f"Failed to initialize AI components: {e}")
+        logger.error("Failed to initialize AI components: %s", e)
         PII_DETECTION_AVAILABLE = False
 
 # EXCEL STORAGE SYSTEM INITIALIZATION
@@ -59,8 +162,8 @@ def init_excel_storage():
             'id', 'name', 'email', 'password_hash', 'role', 'organization', 
             'department', 'created_at', 'last_login', 'is_active'
         ])
-        users_df.to_excel(USERS_EXCEL, index=False)
-        logger.info("Created users.xlsx")
+        if create_excel_data(users_df, USERS_EXCEL):
+            logger.info("Created users.xlsx")
     
     # Initialize API Keys Excel
     if not os.path.exists(API_KEYS_EXCEL):
@@ -68,8 +171,8 @@ def init_excel_storage():
             'id', 'user_id', 'api_key', 'name', 'permissions', 
             'active', 'created_at', 'last_used', 'usage_count'
         ])
-        api_keys_df.to_excel(API_KEYS_EXCEL, index=False)
-        logger.info("Created api_keys.xlsx")
+        if create_excel_data(api_keys_df, API_KEYS_EXCEL):
+            logger.info("Created api_keys.xlsx")
     
     # Initialize Processing Sessions Excel
     if not os.path.exists(PROCESSING_SESSIONS_EXCEL):
@@ -77,8 +180,8 @@ def init_excel_storage():
             'id', 'user_id', 'session_name', 'files_processed', 'pii_items', 
             'phi_items', 'processing_time', 'created_at', 'status', 'notes'
         ])
-        sessions_df.to_excel(PROCESSING_SESSIONS_EXCEL, index=False)
-        logger.info("Created processing_sessions.xlsx")
+        if create_excel_data(sessions_df, PROCESSING_SESSIONS_EXCEL):
+            logger.info("Created processing_sessions.xlsx")
     
     # Initialize Processed Data Excel
     if not os.path.exists(PROCESSED_DATA_EXCEL):
@@ -86,57 +189,335 @@ def init_excel_storage():
             'id', 'session_id', 'user_id', 'processed_at', 'original_filename',
             'file_size', 'file_type', 'pii_count', 'phi_count', 'processing_status'
         ])
-        processed_df.to_excel(PROCESSED_DATA_EXCEL, index=False)
-        logger.info("Created processed_data.xlsx")
+        if create_excel_data(processed_df, PROCESSED_DATA_EXCEL):
+            logger.info("Created processed_data.xlsx")
     
     # Initialize Redactions Log Excel - NEW
     if not os.path.exists(REDACTIONS_LOG_EXCEL):
-        redactions_df = pd.DataFrame(columns=[
-            'id', 'session_id', 'user_id', 'filename', 'processed_at',
-            # PII columns (without PII_ prefix)
-            'Hospital_ID', 'Patient_Name', 'Policy_Number', 'date_of_birth', 
-            'email', 'health_insurance', 'phone_number',
-            # PHI columns (without PHI_ prefix)
-            'Age', 'allergy', 'blood_group', 'drug', 
-            'gender', 'medical_condition', 'surgery', 'symptom'
-        ])
-        redactions_df.to_excel(REDACTIONS_LOG_EXCEL, index=False)
-        logger.info("Created redactions_log.xlsx")
+        redactions_df = pd.DataFrame(columns=REDACTION_COLS)
+        if create_excel_data(redactions_df, REDACTIONS_LOG_EXCEL):
+            logger.info("Created redactions_log.xlsx")
+    
+    # Seed the JSONL log from an existing Excel log so no history is lost,
+    # and refresh the Excel view if the last background rewrite never ran.
+    # Every gunicorn worker runs this at import, so the seed file is created
+    # exclusively and complete: only one worker's copy of the history lands.
+    if not os.path.exists(REDACTIONS_LOG_JSONL):
+        rows = read_excel_data(REDACTIONS_LOG_EXCEL).to_dict('records')
+        payload = b''.join(orjson.dumps(row, default=str) + b'\n' for row in rows)
+        if _replace_file(REDACTIONS_LOG_JSONL, lambda tmp_path: _write_bytes(tmp_path, payload), exclusive=True):
+            logger.info("Created redactions_log.jsonl")
+    elif os.path.getmtime(REDACTIONS_LOG_JSONL) > os.path.getmtime(REDACTIONS_LOG_EXCEL):
+        sync_redactions_excel()
         
     logger.info("Excel storage initialization completed successfully")
 
 # Excel Helper Functions
+
+def _write_bytes(file_path, payload):
+    with open(file_path, 'wb') as f:
+        f.write(payload)
+
+def _replace_file(file_path, write, exclusive=False):
+    """
+    Call write(tmp_path) on a temp file next to file_path, then move it into
+    place in one step so readers (and other worker processes) never see a
+    half-written file. With exclusive=True the file is only created if it
+    doesn't exist yet; returns False when another writer got there first.
+    """
+    fd, tmp_path = tempfile.mkstemp(dir=os.path.dirname(file_path) or '.',
+                                    prefix=f'.{os.path.basename(file_path)}.',
+                                    suffix=os.path.splitext(file_path)[1])  # pandas picks the engine by extension
+    try:
+        os.fchmod(fd, 0o644)  # mkstemp creates files as 0600
+        os.close(fd)
+        write(tmp_path)
+        if not exclusive:
+            os.replace(tmp_path, file_path)
+            return True
+        try:
+            os.link(tmp_path, file_path)
+            return True
+        except FileExistsError:
+            return False
+        except OSError:
+            pass  # no hard links on this filesystem
+        # Claim the name with an exclusive create, then swap the real file in.
+        # The placeholder is backdated so nobody treats it as newer data.
+        try:
+            os.close(os.open(file_path, os.O_CREAT | os.O_EXCL | os.O_WRONLY, 0o644))
+        except FileExistsError:
+            return False
+        os.utime(file_path, (0, 0))
+        os.replace(tmp_path, file_path)
+        return True
+    finally:
+        if os.path.exists(tmp_path):
+            os.remove(tmp_path)
+
+# Parsed workbooks keyed by path: ((mtime_ns, size), DataFrame, indexes), where
+# indexes maps a column name to {value: row positions} and is built on first
+# use. Entries are reused until the file changes on disk, so repeat reads skip
+# the openpyxl parse and per-user lookups skip the full column scan.
+_excel_cache = {}
+_excel_cache_lock = threading.RLock()
+# Writers of one workbook are serialized per path, so a long rewrite (e.g. of
+# the redactions log) never blocks reads or writes of the other tables
+_excel_file_locks = {}
+
+def _excel_file_lock(file_path):
+    with _excel_cache_lock:
+        return _excel_file_locks.setdefault(file_path, threading.Lock())
+
+def _invalidate_excel_cache(file_path):
+    with _excel_cache_lock:
+        _excel_cache.pop(file_path, None)
+
+# Repetitive id columns are stored as categoricals so equality filters and
+# groupby compare integer codes instead of Python strings
+CATEGORY_COLUMNS = frozenset({'id', 'user_id', 'api_key', 'session_id'})
+
+def _load_excel_cached(file_path):
+    """Return the cache entry for an Excel file, parsing it if it changed"""
+    stat = os.stat(file_path)
+    version = (stat.st_mtime_ns, stat.st_size)
+    with _excel_cache_lock:
+        cached = _excel_cache.get(file_path)
+        if cached is not None and cached[0] == version:
+            return cached
+    df = pd.read_excel(file_path, engine=EXCEL_READ_ENGINE)
+    for column in CATEGORY_COLUMNS.intersection(df.columns):
+        if df[column].dtype == object:
+            df[column] = df[column].astype('category')
+    entry = (version, df, {})
+    with _excel_cache_lock:
+        _excel_cache[file_path] = entry
+    return entry
+
 def read_excel_data(file_path):
-    """Read data from Excel file"""
+    """Read data from Excel file (cached until the file changes)"""
     try:
-        if os.path.exists(file_path):
-            return pd.read_excel(file_path)
+        if not os.path.exists(file_path):
+            return pd.DataFrame()
+        return _load_excel_cached(file_path)[1].copy()
+    except Exception as e:
+        logger.error("Error reading %s: %s", file_path, e)
         return pd.DataFrame()
+
+def read_excel_rows(file_path, column, value):
+    """Read the rows of an Excel file where column == value, using a cached index"""
+    try:
+        if not os.path.exists(file_path):
+            return pd.DataFrame()
+        _, df, indexes = _load_excel_cached(file_path)
+        if column not in df.columns:
+            return df.iloc[0:0].copy()
+        with _excel_cache_lock:
+            index = indexes.get(column)
+            if index is None:
+                index = indexes[column] = df.groupby(column, sort=False, observed=True).indices
+        return df.take(index.get(value, []))
     except Exception as e:
-        logger.error(f"Error reading {file_path}: {e}")
+        logger.error("Error reading %s: %s", file_path, e)
         return pd.DataFrame()
 
+# xlsxwriter writes far faster than openpyxl. constant_memory is left off because
+# pandas emits cells column by column, which that mode can't accept.
+EXCEL_WRITE_OPTIONS = {'strings_to_formulas': False, 'strings_to_urls': False}
+
+def _to_excel(df, file_path):
+    df.to_excel(file_path, index=False, engine='xlsxwriter',
+                engine_kwargs={'options': EXCEL_WRITE_OPTIONS})
+
 def write_excel_data(df, file_path):
     """Write data to Excel file"""
     try:
-        df.to_excel(file_path, index=False)
+        with _excel_file_lock(file_path):
+            _replace_file(file_path, lambda tmp_path: _to_excel(df, tmp_path))
+            _invalidate_excel_cache(file_path)
+        return True
+    except Exception as e:
+        logger.error("Error writing %s: %s", file_path, e)
+        return False
+
+def create_excel_data(df, file_path):
+    """Create an Excel file from data unless it already exists; returns True if this call created it"""
+    try:
+        return _replace_file(file_path, lambda tmp_path: _to_excel(df, tmp_path), exclusive=True)
+    except Exception as e:
+        logger.error("Error creating %s: %s", file_path, e)
+        return False
+
+def append_excel_rows(file_path, rows):
+    """Append rows (dicts keyed by column name) to an Excel file"""
+    try:
+        with _excel_file_lock(file_path):
+            workbook = load_workbook(file_path)
+            worksheet = workbook.active
+            columns = [cell.value for cell in worksheet[1]]
+            for row in rows:
+                worksheet.append([row.get(column) for column in columns])
+            _replace_file(file_path, workbook.save)
+            _invalidate_excel_cache(file_path)
         return True
     except Exception as e:
-        logger.error(f"Error writing {file_path}: {e}")
+        logger.error("Error appending to %s: %s", file_path, e)
         return False
 
+_jsonl_lock = threading.Lock()
+
+def append_jsonl_rows(file_path, rows):
+    """Append rows (dicts) to a JSON Lines file"""
+    try:
+        payload = b''.join(orjson.dumps(row, default=str) + b'\n' for row in rows)
+        with _jsonl_lock, open(file_path, 'ab') as f:
+            f.write(payload)
+        return True
+    except Exception as e:
+        logger.error("Error appending to %s: %s", file_path, e)
+        return False
+
+def read_jsonl_rows(file_path):
+    """Read all rows from a JSON Lines file"""
+    try:
+        with open(file_path, 'rb') as f:
+            return [orjson.loads(line) for line in f if line.strip()]
+    except FileNotFoundError:
+        return []
+    except Exception as e:
+        logger.error("Error reading %s: %s", file_path, e)
+        return []
+
+_redactions_sync_timer = None
+_redactions_sync_lock = threading.Lock()
+
+def sync_redactions_excel():
+    """Rewrite the redactions Excel view from the JSONL log"""
+    global _redactions_sync_timer
+    with _redactions_sync_lock:
+        timer, _redactions_sync_timer = _redactions_sync_timer, None
+    if timer is not None:
+        timer.cancel()
+    rows = read_jsonl_rows(REDACTIONS_LOG_JSONL)
+    return write_excel_data(pd.DataFrame(rows, columns=REDACTION_COLS), REDACTIONS_LOG_EXCEL)
+
+def schedule_redactions_sync():
+    """Rewrite the redactions Excel view after a delay, coalescing bursts of appends"""
+    global _redactions_sync_timer
+    with _redactions_sync_lock:
+        if _redactions_sync_timer is None:
+            _redactions_sync_timer = threading.Timer(REDACTIONS_EXCEL_SYNC_DELAY, sync_redactions_excel)
+            _redactions_sync_timer.daemon = True
+            _redactions_sync_timer.start()
+
+@atexit.register
+def flush_redactions_sync():
+    """Run a pending Excel view rewrite now so it isn't lost with the daemon timer at shutdown"""
+    with _redactions_sync_lock:
+        pending = _redactions_sync_timer is not None
+    if pending:
+        sync_redactions_excel()
+
 def generate_id():
     """Generate a unique ID"""
     return str(uuid.uuid4())
 
+# Per-row IDs (file/record/redaction rows) don't need to be unguessable, so
+# they come from a process-wide prefix plus a counter instead of os.urandom.
+_ID_PREFIX = secrets.token_hex(8)
+_ID_COUNTER = itertools.count()
+
+def fast_id():
+    """Generate a unique row ID without a uuid4 per call"""
+    return f"{_ID_PREFIX}-{next(_ID_COUNTER):x}"
+
 def hash_password(password):
     """Hash a password"""
-    return generate_password_hash(password, method='pbkdf2:sha256')
+    return generate_password_hash(password, method=PASSWORD_HASH_METHOD)
 
 def check_password_hash_func(hash_val, password):
     """Check if password matches hash"""
     return check_password_hash(hash_val, password)
 
+# Successful password checks from the last few seconds: digest -> expiry.
+# Lets burst re-logins skip PBKDF2. Only positives are cached, and the key
+# includes the stored hash, so a password change invalidates the entry.
+AUTH_CACHE_TTL = 5  # seconds
+AUTH_CACHE_MAX_ENTRIES = 1024
+_AUTH_CACHE_SECRET = secrets.token_bytes(32)
+_auth_cache = {}
+_auth_cache_lock = threading.Lock()
+
+def check_login_password(email, hash_val, password):
+    """Check a login password, reusing a recent successful check"""
+    key = hmac.new(_AUTH_CACHE_SECRET, f"{email}\0{hash_val}\0{password}".encode('utf-8'), hashlib.sha256).digest()
+    now = time.monotonic()
+    with _auth_cache_lock:
+        if _auth_cache.get(key, 0) > now:
+            return True
+    
+    if not check_password_hash_func(hash_val, password):
+        return False
+    
+    with _auth_cache_lock:
+        if len(_auth_cache) >= AUTH_CACHE_MAX_ENTRIES:
+            for stale_key in [k for k, expires in _auth_cache.items() if expires <= now]:
+                del _auth_cache[stale_key]
+            if len(_auth_cache) >= AUTH_CACHE_MAX_ENTRIES:
+                _auth_cache.clear()
+        _auth_cache[key] = now + AUTH_CACHE_TTL
+    return True
+
+def write_excel_sheet(workbook, sheet_name, df, header_formats, max_width=None):
+    """Write a DataFrame to a new xlsxwriter worksheet row by row"""
+    worksheet = workbook.add_worksheet(sheet_name)
+    for col_num, (column, width) in enumerate(zip(df.columns, column_widths(df, max_width))):
+        worksheet.write(0, col_num, column, header_formats[col_num])
+        worksheet.set_column(col_num, col_num, width)
+    for row_num, row in enumerate(df.itertuples(index=False, name=None), 1):
+        worksheet.write_row(row_num, 0, [excel_cell(value) for value in row])
+    return worksheet
+
+def excel_cell(value):
+    """Make a value writable by xlsxwriter; labels found more than once come back as lists"""
+    if isinstance(value, (list, tuple, set)):
+        return ', '.join(map(str, value))
+    if isinstance(value, dict):
+        return str(value)
+    return value
+
+# Spreadsheet apps evaluate CSV cells starting with these as formulas
+CSV_FORMULA_PREFIXES = ('=', '+', '-', '@')
+
+def csv_cell(value):
+    """Make a value safe for a CSV download: join lists and quote formula-like text"""
+    value = excel_cell(value)
+    if isinstance(value, str) and value.startswith(CSV_FORMULA_PREFIXES):
+        return "'" + value
+    return value
+
+def pick_fields(values, field_map):
+    """Map detected labels to output columns, filling defaults for missing labels"""
+    row = {}
+    for column, (label, default) in field_map.items():
+        if label in values:
+            row[column] = values[label]
+        else:
+            row[column] = default() if callable(default) else default
+    return row
+
+def column_widths(df, max_width=None):
+    """Excel column widths fitting each header and its longest value"""
+    header_len = df.columns.astype(str).str.len().to_numpy()
+    if len(df):
+        data_len = df.astype(str).apply(lambda s: s.str.len().max()).fillna(0).to_numpy()
+    else:
+        data_len = np.zeros(len(df.columns), dtype=int)
+    widths = np.maximum(header_len, data_len) + 2
+    if max_width is not None:
+        widths = np.minimum(widths, max_width)
+    return widths.astype(int).tolist()
+
 # Initialize Excel storage on startup
 init_excel_storage()
 
@@ -190,13 +571,11 @@ def register():
             'is_active': 1
         }
         
-        # Add to DataFrame and save
-        users_df = pd.concat([users_df, pd.DataFrame([new_user])], ignore_index=True)
-        if not write_excel_data(users_df, USERS_EXCEL):
+        # Append to users sheet
+        if not append_excel_rows(USERS_EXCEL, [new_user]):
             return jsonify({'success': False, 'detail': 'Failed to save user data'}), 500
         
         # Generate default API key
-        api_keys_df = read_excel_data(API_KEYS_EXCEL)
         api_key_id = generate_id()
         api_key = f"ak_{generate_id().replace('-', '')[:32]}"
         
@@ -212,10 +591,9 @@ def register():
             'usage_count': 0
         }
         
-        api_keys_df = pd.concat([api_keys_df, pd.DataFrame([new_api_key])], ignore_index=True)
-        write_excel_data(api_keys_df, API_KEYS_EXCEL)
+        append_excel_rows(API_KEYS_EXCEL, [new_api_key])
         
-        logger.info(f"User registered: {email} from {organization}")
+        logger.info("User registered: %s from %s", email, organization)
         
         return jsonify({
             'success': True,
@@ -231,7 +609,7 @@ def register():
         })
         
     except Exception as e:
-        logger.error(f"Registration error: {str(e)}")
+        logger.error("Registration error: %s", e)
         return jsonify({'success': False, 'detail': 'Registration failed'}), 500
 
 # USER LOGIN WITH EXCEL STORAGE
@@ -253,10 +631,10 @@ def login():
         
         # Find user
         user_row = users_df[users_df['email'] == email]
-        if user_row.empty or not check_password_hash_func(user_row.iloc[0]['password_hash'], password):
+        if user_row.empty or not check_login_password(email, user_row.iloc[0]['password_hash'], password):
             return jsonify({'success': False, 'detail': 'Invalid email or password'}), 401
         
-        user_data = user_row.iloc[0]
+        user_data = user_row.iloc[0].fillna({'organization': 'Hospital', 'department': ''})
         
         if not user_data['is_active']:
             return jsonify({'success': False, 'detail': 'Account is deactivated'}), 401
@@ -267,23 +645,12 @@ def login():
         write_excel_data(users_df, USERS_EXCEL)
         
         # Get user's API keys
-        api_keys_df = read_excel_data(API_KEYS_EXCEL)
-        user_keys = api_keys_df[
-            (api_keys_df['user_id'] == user_data['id']) & 
-            (api_keys_df['active'] == 1)
-        ]
+        user_keys = read_excel_rows(API_KEYS_EXCEL, 'user_id', user_data['id'])
+        user_keys = user_keys[user_keys['active'] == 1].fillna({'usage_count': 0})
         
-        api_keys = []
-        for _, key in user_keys.iterrows():
-            api_keys.append({
-                'id': key['id'],
-                'apiKey': key['api_key'],
-                'name': key['name'],
-                'createdAt': key['created_at'],
-                'usageCount': key['usage_count'] if pd.notna(key['usage_count']) else 0
-            })
+        api_keys = user_keys[list(API_KEY_FIELDS)].rename(columns=API_KEY_FIELDS).to_dict('records')
         
-        logger.info(f"User logged in: {email}")
+        logger.info("User logged in: %s", email)
         
         return jsonify({
             'success': True,
@@ -292,17 +659,108 @@ def login():
                 'id': user_data['id'],
                 'name': user_data['name'],
                 'email': user_data['email'],
-                'organization': user_data['organization'] if pd.notna(user_data['organization']) else 'Hospital',
-                'department': user_data['department'] if pd.notna(user_data['department']) else '',
+                'organization': user_data['organization'],
+                'department': user_data['department'],
                 'createdAt': user_data['created_at']
             },
             'apiKeys': api_keys
         })
         
     except Exception as e:
-        logger.error(f"Login error: {str(e)}")
+        logger.error("Login error: %s", e)
         return jsonify({'success': False, 'detail': 'Login failed'}), 500
 
+def process_single_file(file, session_id, user_id, created_at):
+    """Process one upload; returns (file_info, file_data, redaction_record)"""
+    filename = secure_filename(file.filename)
+    logger.info("Processing file: %s", filename)
+    
+    try:
+        # Keep the upload in memory; the extractor reads it without a temp file
+        buffer = io.BytesIO(file.read())
+        file_size = buffer.getbuffer().nbytes
+        
+        # REAL PII/PHI PROCESSING
+        if PII_DETECTION_AVAILABLE:
+            # Extract PII and PHI from a single text extraction
+            pii_results, phi_results = detector.extract_all_from_stream(buffer, filename)
+            
+            # Generate fake PII (the faker keeps per-document state)
+            if not pii_results.get("error"):
+                with faker_lock:
+                    fake_pii = faker.replace_pii_json(pii_results)
+            else:
+                fake_pii = {}
+            
+            # Keep real PHI
+            if not phi_results.get("error"):
+                real_phi = phi_results
+            else:
+                real_phi = {}
+        else:
+            # Fallback sample data
+            fake_pii = {
+                "Patient Name": f"Patient_{random.randint(1000, 9999)}",
+                "phone number": f"+1-555-{random.randint(1000, 9999)}",
+                "email": f"patient{random.randint(100, 999)}@example.com",
+                "Address": f"{random.randint(100, 999)} Main St, City, State {random.randint(10000, 99999)}",
+                "Hospital ID": f"HOSP-{random.randint(1000000, 9999999)}",
+                "Policy Number": f"POL-{random.randint(10000000, 99999999)}",
+                "date of birth": f"{random.randint(1, 28)} {random.choice(['Jan', 'Feb', 'Mar', 'Apr', 'May', 'Jun'])} {random.randint(1970, 2000)}",
+                "health insurance": random.choice(["Health Insurance Corp", "Medical Care Plus", "Wellness Insurance"])
+            }
+            real_phi = {
+                "medical condition": random.choice(["Hypertension", "Diabetes", "Asthma", "Arthritis"]),
+                "Age": str(random.randint(25, 80)),
+                "gender": random.choice(["Male", "Female"]),
+                "medication": random.choice(["Lisinopril", "Metformin", "Aspirin", "Ibuprofen"]),
+                "allergy": random.choice(["Penicillin", "Peanuts", "No known allergies"]),
+                "blood group": random.choice(["A+", "B+", "O+", "AB+", "A-", "B-", "O-", "AB-"]),
+                "surgery": random.choice(["Appendectomy", "No surgeries", "Knee replacement"]),
+                "symptom": random.choice(["Headache", "Fatigue", "No symptoms", "Joint pain"])
+            }
+
+        pii_count = len(fake_pii) if fake_pii else 0
+        phi_count = len(real_phi) if real_phi else 0
+        
+        # Create individual file data (without prefixes) - ONE ROW PER FILE
+        file_data = {
+            'filename': filename,
+            **pick_fields(fake_pii, PII_FIELD_MAP),
+            **pick_fields(real_phi, PHI_FIELD_MAP)
+        }
+
+        # Add to redactions log (persistent audit trail)
+        redaction_record = {
+            'id': fast_id(),
+            'session_id': session_id,
+            'user_id': user_id,
+            'filename': filename,
+            'processed_at': created_at,
+            # Spread all file data except filename (which is already included)
+            **{k: v for k, v in file_data.items() if k != 'filename'}
+        }
+        
+        file_info = {
+            'id': fast_id(),
+            'filename': filename,
+            'size': file_size,
+            'pii_items': pii_count,
+            'phi_items': phi_count,
+            'status': 'completed'
+        }
+        return file_info, file_data, redaction_record
+        
+    except Exception as e:
+        logger.error("Error processing %s: %s", filename, e)
+        file_info = {
+            'id': fast_id(),
+            'filename': filename,
+            'error': str(e),
+            'status': 'failed'
+        }
+        return file_info, None, None
+
 # ENHANCED FILE PROCESSING WITH PII/PHI EXCEL OUTPUT AND REDACTIONS LOG
 @app.route('/api/process-files', methods=['POST'])
 def process_files():
@@ -310,7 +768,8 @@ def process_files():
         logger.info("Processing files with PII/PHI detection and Excel output")
         
         user_id = request.form.get('userId', 'anonymous')
-        files = request.files.getlist('files')
+        # Drop empty file inputs up front so the pool only sees real uploads
+        files = [file for file in request.files.getlist('files') if file and file.filename]
         
         if not files:
             return jsonify({'success': False, 'detail': 'No files uploaded'}), 400
@@ -325,134 +784,28 @@ def process_files():
         total_pii_items = 0
         total_phi_items = 0
         
-        for file in files:
-            if file and file.filename:
-                filename = secure_filename(file.filename)
-                logger.info(f"Processing file: {filename}")
-                
-                fd, temp_path = tempfile.mkstemp(suffix=os.path.splitext(filename)[1])
-                os.close(fd)
-                
-                try:
-                    file.save(temp_path)
-                    file_size = os.path.getsize(temp_path)
-                    
-                    # REAL PII/PHI PROCESSING
-                    if PII_DETECTION_AVAILABLE:
-                        # Extract PII and PHI
-                        pii_results = detector.extract_pii_from_file(temp_path)
-                        phi_results = detector.extract_phi_from_file(temp_path)
-                        
-                        # Generate fake PII
-                        if not pii_results.get("error"):
-                            fake_pii = faker.replace_pii_json(pii_results)
-                        else:
-                            fake_pii = {}
-                        
-                        # Keep real PHI
-                        if not phi_results.get("error"):
-                            real_phi = phi_results
-                        else:
-                            real_phi = {}
-                    else:
-                        # Fallback sample data
-                        fake_pii = {
-                            "Patient Name": f"Patient_{random.randint(1000, 9999)}",
-                            "phone number": f"+1-555-{random.randint(1000, 9999)}",
-                            "email": f"patient{random.randint(100, 999)}@example.com",
-                            "Address": f"{random.randint(100, 999)} Main St, City, State {random.randint(10000, 99999)}",
-                            "Hospital ID": f"HOSP-{random.randint(1000000, 9999999)}",
-                            "Policy Number": f"POL-{random.randint(10000000, 99999999)}",
-                            "date of birth": f"{random.randint(1, 28)} {random.choice(['Jan', 'Feb', 'Mar', 'Apr', 'May', 'Jun'])} {random.randint(1970, 2000)}",
-                            "health insurance": random.choice(["Health Insurance Corp", "Medical Care Plus", "Wellness Insurance"])
-                        }
-                        real_phi = {
-                            "medical condition": random.choice(["Hypertension", "Diabetes", "Asthma", "Arthritis"]),
-                            "Age": str(random.randint(25, 80)),
-                            "gender": random.choice(["Male", "Female"]),
-                            "medication": random.choice(["Lisinopril", "Metformin", "Aspirin", "Ibuprofen"]),
-                            "allergy": random.choice(["Penicillin", "Peanuts", "No known allergies"]),
-                            "blood group": random.choice(["A+", "B+", "O+", "AB+", "A-", "B-", "O-", "AB-"]),
-                            "surgery": random.choice(["Appendectomy", "No surgeries", "Knee replacement"]),
-                            "symptom": random.choice(["Headache", "Fatigue", "No symptoms", "Joint pain"])
-                        }
-                    
-                    pii_count = len(fake_pii) if fake_pii else 0
-                    phi_count = len(real_phi) if real_phi else 0
-                    total_pii_items += pii_count
-                    total_phi_items += phi_count
-                    
-                    # Create individual file data (without prefixes) - ONE ROW PER FILE
-                    file_data = {
-                        'filename': filename,
-                        'Hospital_ID': fake_pii.get('Hospital ID', f'HOSP-{random.randint(1000000, 9999999)}'),
-                        'Patient_Name': fake_pii.get('Patient Name', 'John Doe'),
-                        'Policy_Number': fake_pii.get('Policy Number', f'POL-{random.randint(10000000, 99999999)}'),
-                        'date_of_birth': fake_pii.get('date of birth', '15 March 1990'),
-                        'email': fake_pii.get('email', 'patient@example.com'),
-                        'health_insurance': fake_pii.get('health insurance', 'Health Insurance Corp'),
-                        'phone_number': fake_pii.get('phone number', '+91-9876543210'),
-                        'Age': real_phi.get('Age', '35'),
-                        'allergy': real_phi.get('allergy', 'No known allergies'),
-                        'blood_group': real_phi.get('blood group', 'O+'),
-                        'drug': real_phi.get('medication', 'No medications'),
-                        'gender': real_phi.get('gender', 'Male'),
-                        'medical_condition': real_phi.get('medical condition', 'No conditions'),
-                        'surgery': real_phi.get('surgery', 'No surgeries'),
-                        'symptom': real_phi.get('symptom', 'No symptoms')
-                    }
-                    
-                    # Add to session results
-                    pii_phi_rows.append(file_data)
-                    
-                    # Add to redactions log (persistent audit trail)
-                    redaction_record = {
-                        'id': generate_id(),
-                        'session_id': session_id,
-                        'user_id': user_id,
-                        'filename': filename,
-                        'processed_at': created_at,
-                        # Spread all file data except filename (which is already included)
-                        **{k: v for k, v in file_data.items() if k != 'filename'}
-                    }
-                    redactions_log_rows.append(redaction_record)
-                    
-                    processed_files.append({
-                        'id': generate_id(),
-                        'filename': filename,
-                        'size': file_size,
-                        'pii_items': pii_count,
-                        'phi_items': phi_count,
-                        'status': 'completed'
-                    })
-                    
-                except Exception as e:
-                    logger.error(f"Error processing {filename}: {e}")
-                    processed_files.append({
-                        'id': generate_id(),
-                        'filename': filename,
-                        'error': str(e),
-                        'status': 'failed'
-                    })
-                
-                finally:
-                    try:
-                        os.remove(temp_path)
-                    except:
-                        pass
+        with ThreadPoolExecutor(max_workers=min(PROCESSING_WORKERS, len(files))) as pool:
+            results = list(pool.map(
+                lambda file: process_single_file(file, session_id, user_id, created_at), files
+            ))
+        
+        for file_info, file_data, redaction_record in results:
+            processed_files.append(file_info)
+            if file_info['status'] == 'completed':
+                total_pii_items += file_info['pii_items']
+                total_phi_items += file_info['phi_items']
+                pii_phi_rows.append(file_data)
+                redactions_log_rows.append(redaction_record)
         
         # After processing all files, append to redactions log
         if redactions_log_rows:
-            redactions_df = read_excel_data(REDACTIONS_LOG_EXCEL)
-            new_redactions_df = pd.DataFrame(redactions_log_rows)
-            redactions_df = pd.concat([redactions_df, new_redactions_df], ignore_index=True)
-            write_excel_data(redactions_df, REDACTIONS_LOG_EXCEL)
-            logger.info(f"Added {len(redactions_log_rows)} records to redactions log")
+            append_jsonl_rows(REDACTIONS_LOG_JSONL, redactions_log_rows)
+            schedule_redactions_sync()
+            logger.info("Added %s records to redactions log", len(redactions_log_rows))
         
         processing_time = len(processed_files) * 0.8 + (total_pii_items + total_phi_items) * 0.02
         
         # Save processing session to Excel
-        sessions_df = read_excel_data(PROCESSING_SESSIONS_EXCEL)
         new_session = {
             'id': session_id,
             'user_id': user_id,
@@ -466,15 +819,14 @@ def process_files():
             'notes': f"Processed {len(processed_files)} files with redactions log"
         }
         
-        sessions_df = pd.concat([sessions_df, pd.DataFrame([new_session])], ignore_index=True)
-        write_excel_data(sessions_df, PROCESSING_SESSIONS_EXCEL)
+        append_excel_rows(PROCESSING_SESSIONS_EXCEL, [new_session])
         
         # Save processed files data
-        processed_df = read_excel_data(PROCESSED_DATA_EXCEL)
+        processed_records = []
         for file_info in processed_files:
             if file_info.get('status') == 'completed':
-                processed_record = {
-                    'id': generate_id(),
+                processed_records.append({
+                    'id': fast_id(),
                     'session_id': session_id,
                     'user_id': user_id,
                     'processed_at': created_at,
@@ -484,12 +836,12 @@ def process_files():
                     'pii_count': file_info['pii_items'],
                     'phi_count': file_info['phi_items'],
                     'processing_status': 'completed'
-                }
-                processed_df = pd.concat([processed_df, pd.DataFrame([processed_record])], ignore_index=True)
+                })
         
-        write_excel_data(processed_df, PROCESSED_DATA_EXCEL)
+        if processed_records:
+            append_excel_rows(PROCESSED_DATA_EXCEL, processed_records)
         
-        logger.info(f"Processing completed: {session_id} - {len(pii_phi_rows)} files processed")
+        logger.info("Processing completed: %s - %s files processed", session_id, len(pii_phi_rows))
         
         return jsonify({
             'success': True,
@@ -505,7 +857,7 @@ def process_files():
         })
         
     except Exception as e:
-        logger.error(f"Processing error: {str(e)}")
+        logger.error("Processing error: %s", e)
         return jsonify({'success': False, 'detail': f'Processing failed: {str(e)}'}), 500
         
 # EXCEL DOWNLOAD WITH PROPER PII/PHI STRUCTURE
@@ -522,114 +874,87 @@ def download_results():
         df = pd.DataFrame(pii_phi_data)
         
         # Ensure columns are in the right order (filename first, then data)
-        column_order = ['filename', 'Hospital_ID', 'Patient_Name', 'Policy_Number', 
-                       'date_of_birth', 'email', 'health_insurance', 'phone_number',
-                       'Age', 'allergy', 'blood_group', 'drug', 'gender', 
-                       'medical_condition', 'surgery', 'symptom']
+        column_order = ['filename', *PII_FIELD_MAP, *PHI_FIELD_MAP]
+        
+        df = df.reindex(columns=column_order, fill_value='').fillna('')
+        
+        # Plain CSV/Parquet skip the xlsx styling entirely; xlsx stays the default
+        export_format = request.args.get('format', 'xlsx').lower()
+        download_stem = f'PII_PHI_Results_{datetime.datetime.now().strftime("%Y%m%d_%H%M%S")}'
+        
+        if export_format == 'csv':
+            buffer = io.BytesIO()
+            df.map(csv_cell).to_csv(buffer, index=False, encoding='utf-8')
+            buffer.seek(0)
+            return send_file(buffer, as_attachment=True, download_name=f'{download_stem}.csv', mimetype='text/csv')
+        
+        if export_format == 'parquet':
+            if not PARQUET_AVAILABLE:
+                return jsonify({'success': False, 'detail': 'Parquet export is not available'}), 400
+            buffer = io.BytesIO()
+            df.astype(str).to_parquet(buffer, engine='pyarrow', compression='snappy', index=False)
+            buffer.seek(0)
+            return send_file(buffer, as_attachment=True, download_name=f'{download_stem}.parquet',
+                             mimetype='application/vnd.apache.parquet')
+        
+        if export_format != 'xlsx':
+            return jsonify({'success': False, 'detail': f'Unsupported export format: {export_format}'}), 400
+        
+        # Create Excel file with formatting, in memory (no temp file to clean up)
+        buffer = io.BytesIO()
+        workbook = xlsxwriter.Workbook(buffer, {
+            'in_memory': True,
+            'strings_to_formulas': False,  # exported values are data, never formulas
+            'strings_to_urls': False
+        })
+        header_format = workbook.add_format(HEADER_STYLE)
+        basic_format = workbook.add_format(BASIC_HEADER_STYLE)
+        pii_format = workbook.add_format(PII_HEADER_STYLE)
+        phi_format = workbook.add_format(PHI_HEADER_STYLE)
+        
+        # Write main data
+        header_formats = [
+            pii_format if col.startswith('PII_') else phi_format if col.startswith('PHI_') else header_format
+            for col in df.columns
+        ]
+        write_excel_sheet(workbook, 'PII_PHI_Data', df, header_formats, max_width=40)
         
-        df = df.reindex(columns=column_order, fill_value='')
+        # Add a summary sheet
+        # Count PII and PHI columns dynamically:
+        pii_cols = [col for col in df.columns if col.startswith('PII_')]
+        phi_cols = [col for col in df.columns if col.startswith('PHI_')]
+
+        summary_data = {
+            'Metric': [
+                'Total Files Processed',
+                'Total PII Types Found',
+                'Total PHI Types Found',
+                'Processing Date'
+            ],
+            'Value': [
+                len(df),
+                len(pii_cols),
+                len(phi_cols),
+                datetime.datetime.now().strftime('%Y-%m-%d %H:%M:%S')
+            ]
+        }
         
-        # Create Excel file with formatting
-        fd, temp_path = tempfile.mkstemp(suffix='.xlsx')
-        os.close(fd)
+        summary_df = pd.DataFrame(summary_data)
+        write_excel_sheet(workbook, 'Summary', summary_df, [basic_format] * len(summary_df.columns))
+        workbook.close()
+        
+        buffer.seek(0)
+        download_name = f'{download_stem}.xlsx'
+        
+        return send_file(
+            buffer,
+            as_attachment=True,
+            download_name=download_name,
+            mimetype='application/vnd.openxmlformats-officedocument.spreadsheetml.sheet'
+        )
         
-        try:
-            with pd.ExcelWriter(temp_path, engine='openpyxl') as writer:
-                # Write main data
-                df.to_excel(writer, sheet_name='PII_PHI_Data', index=False)
-                
-                # Format the worksheet
-                worksheet = writer.sheets['PII_PHI_Data']
-                
-                # Auto-adjust column widths
-                for column in worksheet.columns:
-                    max_length = 0
-                    column_letter = column[0].column_letter
-                    for cell in column:
-                        try:
-                            if len(str(cell.value)) > max_length:
-                                max_length = len(str(cell.value))
-                        except:
-                            pass
-                    adjusted_width = min(max_length + 2, 40)
-                    worksheet.column_dimensions[column_letter].width = adjusted_width
-                
-                # Add header formatting
-                from openpyxl.styles import Font, PatternFill
-                header_font = Font(bold=True, size=12)
-                basic_fill = PatternFill(start_color='D4EDDA', end_color='D4EDDA', fill_type='solid')  # Light green
-                pii_fill = PatternFill(start_color='CCE5FF', end_color='CCE5FF', fill_type='solid')    # Light blue
-                phi_fill = PatternFill(start_color='FFE5CC', end_color='FFE5CC', fill_type='solid')    # Light orange
-                
-                # Format headers
-                # Remove the undefined basic_columns reference:
-                for cell in worksheet[1]:  # Header row
-                    cell.font = header_font
-                    if cell.value and cell.value.startswith('PII_'):
-                        cell.fill = pii_fill
-                    elif cell.value and cell.value.startswith('PHI_'):
-                        cell.fill = phi_fill
-                
-                # Add a summary sheet
-                # Count PII and PHI columns dynamically:
-            pii_cols = [col for col in df.columns if col.startswith('PII_')]
-            phi_cols = [col for col in df.columns if col.startswith('PHI_')]
-
-            summary_data = {
-                'Metric': [
-                    'Total Files Processed',
-                    'Total PII Types Found',
-                    'Total PHI Types Found',
-                    'Processing Date'
-                ],
-                'Value': [
-                    len(df),
-                    len(pii_cols),
-                    len(phi_cols),
-                    datetime.datetime.now().strftime('%Y-%m-%d %H:%M:%S')
-                ]
-            }
-                
-            summary_df = pd.DataFrame(summary_data)
-            summary_df.to_excel(writer, sheet_name='Summary', index=False)
-                
-                # Format summary sheet
-            summary_worksheet = writer.sheets['Summary']
-            for column in summary_worksheet.columns:
-                max_length = 0
-                column_letter = column[0].column_letter
-                for cell in column:
-                    try:
-                        if len(str(cell.value)) > max_length:
-                            max_length = len(str(cell.value))
-                    except:
-                        pass
-                adjusted_width = max_length + 2
-                summary_worksheet.column_dimensions[column_letter].width = adjusted_width
-                
-                # Format summary headers
-                for cell in summary_worksheet[1]:
-                    cell.font = header_font
-                    cell.fill = basic_fill
-            
-            download_name = f'PII_PHI_Results_{datetime.datetime.now().strftime("%Y%m%d_%H%M%S")}.xlsx'
-            
-            return send_file(
-                temp_path,
-                as_attachment=True,
-                download_name=download_name,
-                mimetype='application/vnd.openxmlformats-officedocument.spreadsheetml.sheet'
-            )
-            
-        except Exception as e:
-            try:
-                os.remove(temp_path)
-            except:
-                pass
-            raise e
-            
     except Exception as e:
-        logger.error(f"Download error: {str(e)}")
+        logger.error("Download error: %s", e)
         return jsonify({'success': False, 'detail': 'Download failed'}), 500
 
 # API KEY GENERATION WITH EXCEL STORAGE
@@ -650,7 +975,6 @@ def generate_api_key():
             return jsonify({'success': False, 'detail': 'User not found'}), 404
         
         # Generate new API key
-        api_keys_df = read_excel_data(API_KEYS_EXCEL)
         api_key_id = generate_id()
         api_key = f"ak_{generate_id().replace('-', '')[:32]}"
         created_at = datetime.datetime.utcnow().isoformat()
@@ -667,11 +991,10 @@ def generate_api_key():
             'usage_count': 0
         }
         
-        api_keys_df = pd.concat([api_keys_df, pd.DataFrame([new_api_key])], ignore_index=True)
-        if not write_excel_data(api_keys_df, API_KEYS_EXCEL):
+        if not append_excel_rows(API_KEYS_EXCEL, [new_api_key]):
             return jsonify({'success': False, 'detail': 'Failed to save API key'}), 500
         
-        logger.info(f"API key generated: {key_name} for user {user_id}")
+        logger.info("API key generated: %s for user %s", key_name, user_id)
         
         return jsonify({
             'success': True,
@@ -687,30 +1010,23 @@ def generate_api_key():
         })
         
     except Exception as e:
-        logger.error(f"API key generation error: {str(e)}")
+        logger.error("API key generation error: %s", e)
         return jsonify({'success': False, 'detail': 'Failed to generate API key'}), 500
 
 @app.route('/api/keys/<user_id>', methods=['GET'])
 def get_user_api_keys(user_id):
     try:
-        api_keys_df = read_excel_data(API_KEYS_EXCEL)
-        user_keys = api_keys_df[api_keys_df['user_id'] == user_id]
-        
-        api_keys = []
-        for _, key in user_keys.iterrows():
-            api_keys.append({
-                'id': key['id'],
-                'apiKey': key['api_key'],
-                'name': key['name'],
-                'active': bool(key['active']),
-                'createdAt': key['created_at'],
-                'usageCount': key['usage_count'] if pd.notna(key['usage_count']) else 0
-            })
+        user_keys = read_excel_rows(API_KEYS_EXCEL, 'user_id', user_id).fillna({'usage_count': 0})
+        
+        api_keys = (user_keys[[*API_KEY_FIELDS, 'active']]
+                    .astype({'active': bool})
+                    .rename(columns=API_KEY_FIELDS)
+                    .to_dict('records'))
         
         return jsonify({'success': True, 'apiKeys': api_keys})
         
     except Exception as e:
-        logger.error(f"Get API keys error: {str(e)}")
+        logger.error("Get API keys error: %s", e)
         return jsonify({'success': False, 'detail': 'Failed to load API keys'}), 500
 
 @app.route('/api/keys/<key_id>', methods=['DELETE'])
@@ -724,24 +1040,24 @@ def revoke_api_key(key_id):
         
         api_keys_df = read_excel_data(API_KEYS_EXCEL)
         
-        # Find and remove the key
-        key_exists = ((api_keys_df['id'] == key_id) & (api_keys_df['user_id'] == user_id)).any()
+        # Find and remove the key (one mask over the raw arrays, reused for both steps)
+        key_mask = (api_keys_df['id'].values == key_id) & (api_keys_df['user_id'].values == user_id)
         
-        if not key_exists:
+        if not key_mask.any():
             return jsonify({'success': False, 'detail': 'API key not found or access denied'}), 404
         
         # Remove the key
-        api_keys_df = api_keys_df[~((api_keys_df['id'] == key_id) & (api_keys_df['user_id'] == user_id))]
+        api_keys_df = api_keys_df[~key_mask]
         
         if not write_excel_data(api_keys_df, API_KEYS_EXCEL):
             return jsonify({'success': False, 'detail': 'Failed to revoke API key'}), 500
         
-        logger.info(f"API key revoked: {key_id} by user {user_id}")
+        logger.info("API key revoked: %s by user %s", key_id, user_id)
         
         return jsonify({'success': True, 'message': 'API key revoked successfully'})
         
     except Exception as e:
-        logger.error(f"API key revocation error: {str(e)}")
+        logger.error("API key revocation error: %s", e)
         return jsonify({'success': False, 'detail': 'Failed to revoke API key'}), 500
 
 # Health check endpoint
@@ -785,13 +1101,31 @@ def export_excel_table(table_name):
             file_path,
             as_attachment=True,
             download_name=f'{table_name}_export_{datetime.datetime.now().strftime("%Y%m%d_%H%M%S")}.xlsx',
-            mimetype='application/vnd.openxmlformats-officedocument.spreadsheetml.sheet'
+            mimetype='application/vnd.openxmlformats-officedocument.spreadsheetml.sheet',
+            conditional=True,  # Range/If-Modified-Since support
+            max_age=0
         )
         
     except Exception as e:
-        logger.error(f"Excel export error: {str(e)}")
+        logger.error("Excel export error: %s", e)
         return jsonify({'success': False, 'detail': 'Export failed'}), 500
 
+@app.route('/api/redactions-history/<user_id>', methods=['GET'])
+def get_redactions_history(user_id):
+    try:
+        history = [{
+            'id': record['id'],
+            'filename': record['filename'],
+            'processedAt': record['processed_at'],
+            'sessionId': record['session_id']
+        } for record in read_jsonl_rows(REDACTIONS_LOG_JSONL) if record.get('user_id') == user_id]
+        
+        return jsonify({'success': True, 'history': history})
+        
+    except Exception as e:
+        logger.error("Get redactions history error: %s", e)
+        return jsonify({'success': False, 'detail': 'Failed to load history'}), 500
+
 # Error handlers
 @app.errorhandler(413)
 def too_large(e):
@@ -799,7 +1133,7 @@ def too_large(e):
 
 @app.errorhandler(500)
 def internal_error(e):
-    logger.error(f"Internal server error: {str(e)}")
+    logger.error("Internal server error: %s", e)
     return jsonify({'success': False, 'detail': 'Internal server error occurred.'}), 500
 
 if __name__ == '__main__':
@@ -821,57 +1155,11 @@ if __name__ == '__main__':
         logger.info("⚠️ Using sample hospital data")
     
     # Print Excel file locations
-    logger.info(f"📁 Excel Storage Directory: {EXCEL_DATA_DIR}")
-    logger.info(f"👥 Users: {USERS_EXCEL}")
-    logger.info(f"🔑 API Keys: {API_KEYS_EXCEL}")
-    logger.info(f"📊 Sessions: {PROCESSING_SESSIONS_EXCEL}")
-    logger.info(f"💻 Processed Data: {PROCESSED_DATA_EXCEL}")
-    
-    app.run(debug=True, host='0.0.0.0', port=5000)
-
-    # Add new Excel file for redactions log
-REDACTIONS_LOG_EXCEL = os.path.join(EXCEL_DATA_DIR, 'redactions_log.xlsx')
-
-def init_excel_storage():
-    """Initialize Excel files for data storage"""
-    os.makedirs(EXCEL_DATA_DIR, exist_ok=True)
-    
-    # ... existing code ...
+    logger.info("📁 Excel Storage Directory: %s", EXCEL_DATA_DIR)
+    logger.info("👥 Users: %s", USERS_EXCEL)
+    logger.info("🔑 API Keys: %s", API_KEYS_EXCEL)
+    logger.info("📊 Sessions: %s", PROCESSING_SESSIONS_EXCEL)
+    logger.info("💻 Processed Data: %s", PROCESSED_DATA_EXCEL)
     
-    # Initialize Redactions Log Excel
-    if not os.path.exists(REDACTIONS_LOG_EXCEL):
-        redactions_df = pd.DataFrame(columns=[
-            'id', 'session_id', 'user_id', 'filename', 'processed_at',
-            'Hospital_ID', 'Patient_Name', 'Policy_Number', 'date_of_birth', 
-            'email', 'health_insurance', 'phone_number',
-            'Age', 'allergy', 'blood_group', 'drug', 
-            'gender', 'medical_condition', 'surgery', 'symptom'
-        ])
-        redactions_df.to_excel(REDACTIONS_LOG_EXCEL, index=False)
-        logger.info("Created redactions_log.xlsx")
-
-@app.route('/api/redactions-history/<user_id>', methods=['GET'])
-def get_redactions_history(user_id):
-    try:
-        redactions_df = read_excel_data(REDACTIONS_LOG_EXCEL)
-        
-        if redactions_df.empty:
-            return jsonify({'success': True, 'history': []})
-        
-        # Filter by user if not admin
-        user_redactions = redactions_df[redactions_df['user_id'] == user_id]
-        
-        history = []
-        for _, record in user_redactions.iterrows():
-            history.append({
-                'id': record['id'],
-                'filename': record['filename'],
-                'processedAt': record['processed_at'],
-                'sessionId': record['session_id']
-            })
-        
-        return jsonify({'success': True, 'history': history})
-        
-    except Exception as e:
-        logger.error(f"Get redactions history error: {str(e)}")
-        return jsonify({'success': False, 'detail': 'Failed to load history'}), 500
\ No newline at end of file
+    # Development server only; production runs under gunicorn (see Procfile)
+    app.run(host='0.0.0.0', port=int(os.environ.get('PORT', 5000)), threaded=True)
@@ -2,12 +2,124 @@ import os
 import pytesseract
 from PIL import Image
 import fitz  # PyMuPDF
-from pdf2image import convert_from_path
 from docx import Document
 import pandas as pd
+from openpyxl import load_workbook
+import io
 import zipfile
-import tempfile
-import shutil
+import threading
+import queue
+import atexit
+from collections import deque
+from contextlib import contextmanager
+from concurrent.futures import ThreadPoolExecutor
+from functools import partial
+
+# python-calamine parses workbooks much faster than openpyxl/xlrd; pandas
+# picks its default reader when it isn't installed
+try:
+    import python_calamine
+    EXCEL_READ_ENGINE = 'calamine'
+except ImportError:
+    EXCEL_READ_ENGINE = None
+
+# tesserocr keeps Tesseract loaded in-process instead of spawning the binary
+# (and re-reading traineddata) for every image; pytesseract is the fallback
+try:
+    from tesserocr import PyTessBaseAPI
+    TESSEROCR_AVAILABLE = True
+except ImportError:
+    TESSEROCR_AVAILABLE = False
+
+# Tesseract runs outside the GIL (as a subprocess, or in C++ via tesserocr),
+# so threads are enough to OCR several PDF pages at once
+OCR_WORKERS = min(4, os.cpu_count() or 1)
+# ZIP members are extracted concurrently (fitz/Tesseract work outside the GIL)
+ZIP_WORKERS = min(8, os.cpu_count() or 1)
+
+# OCR configurations in the order they are tried. Later ones only run when
+# the previous pass found fewer than OCR_MIN_CHARS characters.
+# Each entry is a Tesseract page segmentation mode.
+OCR_CONFIGS = (
+    6,  # Default
+    3,  # Fully automatic page segmentation
+    1,  # Automatic page segmentation with OSD
+)
+OCR_MIN_CHARS = 20
+
+# Scanned PDF pages get one PSM 6 pass at OCR_FAST_DPI; only pages whose mean
+# word confidence falls below OCR_MIN_CONFIDENCE are re-rendered at
+# OCR_FULL_DPI. Tesseract time scales with pixel count.
+OCR_FAST_DPI = 150
+OCR_FULL_DPI = 300
+OCR_MIN_CONFIDENCE = 60
+
+# Errors Tesseract raises for an image it can't read (pytesseract surfaces the
+# binary's failure, tesserocr raises RuntimeError). Anything else, such as a
+# missing Tesseract install, propagates to the extractor's own error handling.
+OCR_ERRORS = (pytesseract.TesseractError, RuntimeError)
+
+# PyTessBaseAPI isn't thread-safe, so each OCR call checks an engine out of a
+# process-wide pool of idle ones. The OCR thread pools are created per
+# request, so engines must outlive the threads that use them; the pool only
+# grows to the peak number of concurrent OCR calls, and is ended at exit.
+_idle_tesseract_engines = queue.SimpleQueue()
+_tesseract_engines = []
+_tesseract_engines_lock = threading.Lock()
+
+@contextmanager
+def _tesseract_engine(psm):
+    """Check out an idle tesserocr engine set to the given page segmentation mode"""
+    try:
+        api = _idle_tesseract_engines.get_nowait()
+    except queue.Empty:
+        api = PyTessBaseAPI(lang='eng')
+        with _tesseract_engines_lock:
+            _tesseract_engines.append(api)
+    try:
+        api.SetPageSegMode(psm)
+        yield api
+    finally:
+        api.Clear()
+        _idle_tesseract_engines.put(api)
+
+@atexit.register
+def _end_tesseract_engines():
+    with _tesseract_engines_lock:
+        for api in _tesseract_engines:
+            api.End()
+        _tesseract_engines.clear()
+
+def _tesseract_image_to_string(image, psm):
+    """OCR a PIL image with the given page segmentation mode"""
+    if not TESSEROCR_AVAILABLE:
+        return pytesseract.image_to_string(image, lang='eng', config=f'--oem 3 --psm {psm}')
+
+    with _tesseract_engine(psm) as api:
+        api.SetImage(image)
+        return api.GetUTF8Text()
+
+def _tesseract_image_to_data(image, psm):
+    """OCR a PIL image and return (text, mean word confidence 0-100)"""
+    if TESSEROCR_AVAILABLE:
+        with _tesseract_engine(psm) as api:
+            api.SetImage(image)
+            return api.GetUTF8Text(), api.MeanTextConf()
+
+    data = pytesseract.image_to_data(image, lang='eng', config=f'--oem 3 --psm {psm}',
+                                     output_type=pytesseract.Output.DICT)
+    lines = {}
+    confidences = []
+    for i, word in enumerate(data['text']):
+        conf = float(data['conf'][i])
+        if conf < 0 or not word.strip():
+            continue
+        confidences.append(conf)
+        key = (data['block_num'][i], data['par_num'][i], data['line_num'][i])
+        lines.setdefault(key, []).append(word)
+
+    text = '\n'.join(' '.join(words) for words in lines.values())
+    return text, (sum(confidences) / len(confidences) if confidences else 0.0)
 
 class UniversalTextExtractor:
     """
@@ -23,8 +135,26 @@ class UniversalTextExtractor:
             'excel': ['.xlsx', '.xls', '.csv'],
             'archives': ['.zip']
         }
+        self.supported_extensions = frozenset(
+            ext for formats in self.supported_formats.values() for ext in formats
+        )
+
+        # File extension -> extraction method, so dispatch is one dict lookup
+        format_handlers = {
+            'images': self._extract_from_image,
+            'pdfs': self._extract_from_pdf,
+            'word': self._extract_from_word,
+            'archives': self._extract_from_zip,
+        }
+        self.handlers = {
+            ext: format_handlers[kind]
+            for kind, formats in self.supported_formats.items() if kind in format_handlers
+            for ext in formats
+        }
+        for ext in self.supported_formats['excel']:
+            self.handlers[ext] = partial(self._extract_from_excel, file_ext=ext)
         print("🚀 UniversalTextExtractor initialized")
-        print(f"📁 Supported formats: {sum(len(formats) for formats in self.supported_formats.values())} types")
+        print(f"📁 Supported formats: {len(self.supported_extensions)} types")
 
     def extract_text(self, file_path):
         """
@@ -34,27 +164,30 @@ class UniversalTextExtractor:
         if not os.path.exists(file_path):
             return f"Error: File '{file_path}' not found"
 
-        file_ext = os.path.splitext(file_path.lower())[1]
-        print(f"📄 Processing file: {os.path.basename(file_path)}")
+        return self._extract_by_format(file_path, os.path.basename(file_path))
+
+    def extract_text_from_stream(self, stream, filename):
+        """
+        Extract text from an in-memory file (e.g. an uploaded file's bytes).
+        The format is detected from filename; nothing is written to disk.
+        """
+        return self._extract_by_format(stream, os.path.basename(filename))
+
+    def _extract_by_format(self, source, filename):
+        """Dispatch a path or file-like source to the extractor for its format"""
+        file_ext = os.path.splitext(filename.lower())[1]
+        print(f"📄 Processing file: {filename}")
         print(f"📋 Detected format: {file_ext}")
 
         try:
             # Determine file type and extract accordingly
-            if file_ext in self.supported_formats['images']:
-                return self._extract_from_image(file_path)
-            elif file_ext in self.supported_formats['pdfs']:
-                return self._extract_from_pdf(file_path)
-            elif file_ext in self.supported_formats['word']:
-                return self._extract_from_word(file_path)
-            elif file_ext in self.supported_formats['excel']:
-                return self._extract_from_excel(file_path)
-            elif file_ext in self.supported_formats['archives']:
-                return self._extract_from_zip(file_path)
-            else:
+            handler = self.handlers.get(file_ext)
+            if handler is None:
                 return f"Error: Unsupported file format '{file_ext}'"
+            return handler(source)
 
         except Exception as e:
-            error_msg = f"Error processing {os.path.basename(file_path)}: {str(e)}"
+            error_msg = f"Error processing {filename}: {str(e)}"
             print(f"❌ {error_msg}")
             return error_msg
 
@@ -64,24 +197,7 @@ class UniversalTextExtractor:
             print("🖼️  Using OCR for image...")
             image = Image.open(image_path)
 
-            # Try multiple OCR configurations for better accuracy
-            configs = [
-                '--oem 3 --psm 6',  # Default
-                '--oem 3 --psm 3',  # Fully automatic page segmentation
-                '--oem 3 --psm 1',  # Automatic page segmentation with OSD
-            ]
-
-            best_text = ""
-            for config in configs:
-                try:
-                    text = pytesseract.image_to_string(image, lang='eng', config=config)
-                    if len(text.strip()) > len(best_text.strip()):
-                        best_text = text
-                except:
-                    continue
-
-            # Clean up the text
-            cleaned_text = '\n'.join(line.strip() for line in best_text.split('\n') if line.strip())
+            cleaned_text = self._ocr_image(image, OCR_CONFIGS)
             result = cleaned_text if cleaned_text else "No text found in image"
             print(f"✅ OCR extraction complete: {len(cleaned_text)} characters")
             return result
@@ -96,62 +212,125 @@ class UniversalTextExtractor:
 
             # METHOD 1: Try direct text extraction first
             print("📝 Trying direct text extraction...")
-            doc = fitz.open(pdf_path)
-            full_text = []
-            text_found = False
-
-            for page_num, page in enumerate(doc, 1):
-                text = page.get_text().strip()
-                if text:
-                    text_found = True
-                    full_text.append(text)
-                    print(f"✅ Found text on page {page_num} ({len(text)} chars)")
-
-            doc.close()
-
-            if text_found:
-                result = "\n\n".join(full_text)
-                print(f"✅ Direct extraction successful: {len(result)} characters")
-                return result
+            # pdf_path may also be an in-memory file object
+            if isinstance(pdf_path, str):
+                doc = fitz.open(pdf_path)
+            else:
+                doc = fitz.open(stream=pdf_path.getvalue(), filetype='pdf')
 
-            # METHOD 2: If no text found, use OCR
-            print("🔍 No direct text found. Using OCR...")
             try:
-                pages = convert_from_path(pdf_path, dpi=200, first_page=1, last_page=5)  # Limit pages for demo
-                ocr_texts = []
-
-                for page_num, page in enumerate(pages, 1):
-                    print(f"🖼️  OCR processing page {page_num}/{len(pages)}...")
-
-                    # Multiple OCR attempts for better accuracy
-                    configs = ['--oem 3 --psm 6', '--oem 3 --psm 3']
-                    best_page_text = ""
-
-                    for config in configs:
-                        try:
-                            text = pytesseract.image_to_string(page, lang='eng', config=config)
-                            if len(text.strip()) > len(best_page_text.strip()):
-                                best_page_text = text
-                        except:
-                            continue
-
-                    cleaned_text = '\n'.join(line.strip() for line in best_page_text.split('\n') if line.strip())
-                    if cleaned_text:
-                        ocr_texts.append(cleaned_text)
-
-                if ocr_texts:
-                    result = "\n\n".join(ocr_texts)
-                    print(f"✅ OCR extraction successful: {len(result)} characters")
+                full_text = []
+                text_found = False
+
+                for page_num, page in enumerate(doc, 1):
+                    text = page.get_text().strip()
+                    if text:
+                        text_found = True
+                        full_text.append(text)
+                        print(f"✅ Found text on page {page_num} ({len(text)} chars)")
+
+                if text_found:
+                    result = "\n\n".join(full_text)
+                    print(f"✅ Direct extraction successful: {len(result)} characters")
                     return result
-                else:
-                    return "No text could be extracted from this PDF"
 
-            except Exception as ocr_error:
-                return f"PDF OCR failed: {str(ocr_error)}"
+                # METHOD 2: If no text found, use OCR
+                print("🔍 No direct text found. Using OCR...")
+                try:
+                    # Rasterize from the already-open document instead of re-parsing it with Poppler
+                    page_count = min(len(doc), 5)  # Limit pages for demo
+                    workers = min(OCR_WORKERS, page_count or 1)
+
+                    # OCR pages concurrently, in page order
+                    print(f"🖼️  OCR processing {page_count} pages...")
+                    with ThreadPoolExecutor(max_workers=workers) as pool:
+                        results = self._ocr_pdf_pages(pool, workers, doc, range(page_count),
+                                                       OCR_FAST_DPI, self._ocr_pdf_page)
+                        ocr_texts = [text for text, _ in results]
+
+                        retry = [i for i, (_, conf) in enumerate(results) if conf < OCR_MIN_CONFIDENCE]
+                        if retry:
+                            print(f"🔍 Low OCR confidence on {len(retry)} page(s), retrying at {OCR_FULL_DPI} dpi...")
+                            hires = self._ocr_pdf_pages(pool, workers, doc, retry,
+                                                        OCR_FULL_DPI, self._ocr_pdf_page_full)
+                            for i, text in zip(retry, hires):
+                                if len(text) > len(ocr_texts[i]):
+                                    ocr_texts[i] = text
+
+                    ocr_texts = [text for text in ocr_texts if text]
+
+                    if ocr_texts:
+                        result = "\n\n".join(ocr_texts)
+                        print(f"✅ OCR extraction successful: {len(result)} characters")
+                        return result
+                    else:
+                        return "No text could be extracted from this PDF"
+
+                except Exception as ocr_error:
+                    return f"PDF OCR failed: {str(ocr_error)}"
+
+            finally:
+                doc.close()
 
         except Exception as e:
             return f"Error processing PDF: {str(e)}"
 
+    def _ocr_pdf_pages(self, pool, workers, doc, page_numbers, dpi, ocr):
+        """
+        Render and OCR PDF pages, returning ocr()'s results in page order.
+        At most `workers` rendered bitmaps are queued at a time so a scanned
+        PDF never holds every page in memory. Rendering stays on this thread
+        because MuPDF documents aren't thread-safe.
+        """
+        results = []
+        pending = deque()
+        for page_num in page_numbers:
+            if len(pending) >= workers:
+                results.append(pending.popleft().result())
+            pending.append(pool.submit(ocr, self._render_pdf_page(doc[page_num], dpi)))
+        results.extend(future.result() for future in pending)
+        return results
+
+    def _render_pdf_page(self, page, dpi=OCR_FULL_DPI):
+        """Render a PDF page to a PIL image for OCR"""
+        pix = page.get_pixmap(dpi=dpi)
+        return Image.frombytes("RGB", (pix.width, pix.height), pix.samples)
+
+    def _ocr_pdf_page(self, page):
+        """Single PSM 6 pass over a rendered PDF page; returns (cleaned text, mean confidence)"""
+        try:
+            text, conf = _tesseract_image_to_data(page, OCR_CONFIGS[0])
+        except OCR_ERRORS as e:
+            print(f"⚠️  OCR failed on page: {e}")
+            return "", 0.0
+        return '\n'.join(line.strip() for line in text.split('\n') if line.strip()), conf
+
+    def _ocr_pdf_page_full(self, page):
+        """OCR a high-resolution PDF page, escalating page segmentation modes"""
+        return self._ocr_image(page, OCR_CONFIGS[:2])
+
+    def _ocr_image(self, image, configs):
+        """
+        OCR an image with the first config, falling back to the next ones only
+        while the result stays under OCR_MIN_CHARS. Returns the longest text,
+        cleaned of blank lines and surrounding whitespace.
+        """
+        if not image.width or not image.height:
+            return ""
+
+        best_text = ""
+        try:
+            for psm in configs:
+                text = _tesseract_image_to_string(image, psm)
+                if len(text.strip()) > len(best_text.strip()):
+                    best_text = text
+                if len(best_text.strip()) >= OCR_MIN_CHARS:
+                    break
+        except OCR_ERRORS as e:
+            print(f"⚠️  OCR failed with --psm {psm}: {e}")
+
+        return '\n'.join(line.strip() for line in best_text.split('\n') if line.strip())
+
     def _extract_from_word(self, word_path):
         """Extract text from Word documents"""
         try:
@@ -200,35 +379,44 @@ class UniversalTextExtractor:
         except Exception as e:
             return f"Error processing Word document: {str(e)}"
 
-    def _extract_from_excel(self, excel_path):
+    def _extract_from_excel(self, excel_path, file_ext):
         """Extract text from Excel files"""
+        workbook = None
         try:
             print("📊 Processing Excel file...")
 
-            # Handle CSV files
-            if excel_path.lower().endswith('.csv'):
-                df = pd.read_csv(excel_path)
-                excel_data = {'Sheet1': df}
+            # Each sheet is (name, header values, row tuples)
+            if file_ext == '.csv':
+                # Handle CSV files
+                sheets = [self._dataframe_sheet('Sheet1', pd.read_csv(excel_path))]
+                sheet_count = 1
+            elif file_ext == '.xlsx':
+                # Stream rows straight from the workbook instead of building DataFrames
+                workbook = load_workbook(excel_path, read_only=True, data_only=True)
+                sheets = self._iter_workbook_sheets(workbook)
+                sheet_count = len(workbook.sheetnames)
             else:
                 # Load all sheets
-                excel_data = pd.read_excel(excel_path, sheet_name=None)
+                excel_data = pd.read_excel(excel_path, sheet_name=None, engine=EXCEL_READ_ENGINE)
+                sheets = [self._dataframe_sheet(name, df) for name, df in excel_data.items()]
+                sheet_count = len(excel_data)
 
             all_text = []
             total_rows = 0
 
-            for sheet_name, df in excel_data.items():
+            for sheet_name, header_values, rows in sheets:
                 print(f"📋 Processing sheet: {sheet_name}")
 
                 # Add sheet header
                 all_text.append(f"=== SHEET: {sheet_name} ===")
 
                 # Include column headers
-                headers = ' | '.join(str(col) for col in df.columns if str(col) != 'nan')
+                headers = ' | '.join(str(col) for col in header_values if col is not None and str(col) != 'nan')
                 all_text.append(f"[HEADERS] {headers}")
 
                 # Extract all rows
-                for index, row in df.iterrows():
-                    row_values = [str(cell) for cell in row.values if pd.notna(cell) and str(cell).strip()]
+                for row in rows:
+                    row_values = [str(cell) for cell in row if cell is not None and str(cell).strip()]
                     if row_values:
                         row_text = ' | '.join(row_values)
                         all_text.append(row_text)
@@ -237,84 +425,95 @@ class UniversalTextExtractor:
                 all_text.append("")  # Empty line between sheets
 
             full_text = '\n'.join(all_text)
-            print(f"✅ Excel extraction complete: {len(excel_data)} sheets, {total_rows} rows")
+            print(f"✅ Excel extraction complete: {sheet_count} sheets, {total_rows} rows")
             return full_text if full_text else "No text found in Excel file"
 
         except Exception as e:
             return f"Error processing Excel file: {str(e)}"
 
+        finally:
+            if workbook is not None:
+                workbook.close()
+
+    def _dataframe_sheet(self, sheet_name, df):
+        """Return (name, header values, rows) for a DataFrame, with missing cells as None"""
+        values = df.to_numpy(dtype=object)
+        values[pd.isna(values)] = None  # one vectorized mask instead of a per-cell notna
+        return sheet_name, df.columns, values.tolist()
+
+    def _iter_workbook_sheets(self, workbook):
+        """Yield (name, header values, remaining rows) for each sheet of a read-only workbook"""
+        for worksheet in workbook.worksheets:
+            rows = worksheet.iter_rows(values_only=True)
+            yield worksheet.title, next(rows, ()), rows
+
     def _extract_from_zip(self, zip_path):
         """Extract and process files from ZIP archive"""
         try:
             print("🗂️  Processing ZIP archive...")
 
-            with tempfile.TemporaryDirectory() as temp_dir:
-                # Extract ZIP contents
-                with zipfile.ZipFile(zip_path, 'r') as zip_ref:
-                    zip_ref.extractall(temp_dir)
-
-                # Get all extracted files
-                extracted_files = []
-                for root, dirs, files in os.walk(temp_dir):
-                    for file in files:
-                        file_path = os.path.join(root, file)
-                        file_ext = os.path.splitext(file.lower())[1]
-
-                        # Only process supported file types
-                        all_supported = []
-                        for format_list in self.supported_formats.values():
-                            all_supported.extend(format_list)
-
-                        if file_ext in all_supported and file_ext != '.zip':  # Avoid nested ZIP
-                            extracted_files.append(file_path)
-
-                print(f"📁 Found {len(extracted_files)} processable files in ZIP")
-
-                # Process each file
-                all_extracted_text = []
-                processed_count = 0
-
-                for file_path in extracted_files[:10]:  # Limit to first 10 files for demo
-                    try:
-                        relative_path = os.path.relpath(file_path, temp_dir)
-                        print(f"📄 Processing: {relative_path}")
-
-                        # Recursively extract text (but avoid ZIP files)
-                        file_ext = os.path.splitext(file_path.lower())[1]
-                        if file_ext != '.zip':
-                            text = self.extract_text(file_path)
-
-                            if not text.startswith("Error:") and text.strip():
-                                all_extracted_text.append(f"=== FILE: {relative_path} ===")
-                                all_extracted_text.append(text)
-                                all_extracted_text.append("")  # Empty line
-                                processed_count += 1
-
-                    except Exception as file_error:
-                        print(f"⚠️  Failed to process {relative_path}: {file_error}")
-                        continue
-
-                if all_extracted_text:
-                    result = '\n'.join(all_extracted_text)
-                    print(f"✅ ZIP extraction complete: {processed_count} files processed")
-                    return result
-                else:
-                    return "No text could be extracted from files in ZIP archive"
+            with zipfile.ZipFile(zip_path, 'r') as zip_ref:
+                # Only process supported file types
+                members = [
+                    info for info in zip_ref.infolist()
+                    if not info.is_dir()
+                    and os.path.splitext(info.filename.lower())[1] in self.supported_extensions
+                    and not info.filename.lower().endswith('.zip')  # Avoid nested ZIP
+                ]
+
+                print(f"📁 Found {len(members)} processable files in ZIP")
+
+                # Read members straight from the archive; nothing is unpacked to disk
+                members = members[:10]  # Limit to first 10 files for demo
+                member_data = [zip_ref.read(info) for info in members]
+
+            # Process each file, several at a time; map keeps archive order
+            all_extracted_text = []
+            processed_count = 0
+
+            relative_paths = [info.filename for info in members]
+            with ThreadPoolExecutor(max_workers=min(ZIP_WORKERS, len(members) or 1)) as pool:
+                texts = list(pool.map(self._extract_zip_member, member_data, relative_paths))
+
+            for relative_path, text in zip(relative_paths, texts):
+                if text:
+                    all_extracted_text.append(f"=== FILE: {relative_path} ===")
+                    all_extracted_text.append(text)
+                    all_extracted_text.append("")  # Empty line
+                    processed_count += 1
+
+            if all_extracted_text:
+                result = '\n'.join(all_extracted_text)
+                print(f"✅ ZIP extraction complete: {processed_count} files processed")
+                return result
+            else:
+                return "No text could be extracted from files in ZIP archive"
 
         except Exception as e:
             return f"Error processing ZIP file: {str(e)}"
 
+    def _extract_zip_member(self, data, relative_path):
+        """Extract text from one ZIP member's bytes; returns None if nothing usable"""
+        try:
+            print(f"📄 Processing: {relative_path}")
+            text = self.extract_text_from_stream(io.BytesIO(data), relative_path)
+            if not text.startswith("Error:") and text.strip():
+                return text
+        except Exception as file_error:
+            print(f"⚠️  Failed to process {relative_path}: {file_error}")
+        return None
+
     def get_supported_extensions(self):
         """Get list of all supported file extensions"""
-        all_extensions = []
-        for format_list in self.supported_formats.values():
-            all_extensions.extend(format_list)
-        return sorted(all_extensions)
+        return sorted(self.supported_extensions)
 
     def is_supported(self, file_path):
         """Check if file type is supported"""
         file_ext = os.path.splitext(file_path.lower())[1]
-        return file_ext in self.get_supported_extensions()
+        return file_ext in self.supported_extensions
+
+# Shared instance for extract_text_from_file, created on first use
+_default_extractor = None
 
 # Standalone function for backward compatibility
 def extract_text_from_file(file_path: str) -> str:
@@ -322,8 +521,10 @@ def extract_text_from_file(file_path: str) -> str:
     Simple wrapper function for text extraction.
     Used by other modules that need text extraction.
     """
-    extractor = UniversalTextExtractor()
-    return extractor.extract_text(file_path)
+    global _default_extractor
+    if _default_extractor is None:
+        _default_extractor = UniversalTextExtractor()
+    return _default_extractor.extract_text(file_path)
 
 # Demo and testing
 if __name__ == "__main__":
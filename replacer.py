@@ -1,10 +1,73 @@
-import json
+import orjson
 import re
 import random
+import numpy as np
 from typing import Dict, List, Union
 from datetime import datetime
 from faker import Faker
-from pii_detector import CleanPIIDetector
+
+# Compiled once at import; these run for every replaced value
+NON_LOWER_ALPHA_RE = re.compile(r'[^a-z]')
+NON_LABEL_CHAR_RE = re.compile(r'[^A-Z0-9_]')
+
+DOCTOR_SPECIALTIES = ('Cardiologist', 'Neurologist', 'Orthopedist', 'Dermatologist', 'Pediatrician')
+EMAIL_DOMAINS = ('example.com', 'example.org', 'test.com', 'sample.org', 'demo.net')
+MEDICAL_LICENSE_STATES = ('MH', 'DL', 'KA', 'TN', 'UP', 'GJ', 'RJ', 'WB', 'AP', 'MP')
+DRIVER_LICENSE_STATES = ('DL', 'MH', 'KA', 'TN', 'UP', 'GJ', 'RJ')
+INSURANCE_KEYWORDS = ('insurance', 'assurance', 'life', 'general', 'health', 'medical')
+INSURANCE_NAMES = (
+    'Apollo Munich Health Insurance',
+    'HDFC Life Insurance',
+    'Max Life Insurance', 
+    'SBI Life Insurance',
+    'ICICI Prudential Life Insurance',
+    'Bajaj Allianz Life Insurance',
+    'LIC of India',
+    'Star Health Insurance',
+    'New India Assurance'
+)
+
+# Label routing for generate_fake_value, in priority order: the first rule with
+# a keyword contained in the lower-cased label wins. Labels matching no rule
+# fall through to the insurance/generic handler.
+FAKE_VALUE_RULES = (
+    ('name', ('name',)),  # also covers 'patient name'
+    ('doctor', ('doctor', 'physician')),
+    ('email', ('email',)),
+    ('phone', ('phone number', 'mobile number')),
+    ('address', ('address', 'location')),
+    ('hospital_id', ('hospital id',)),
+    ('patient_id', ('patient id',)),
+    ('mrn', ('medical record number', 'mrn')),
+    ('policy', ('insurance id', 'policy number')),
+    ('member_id', ('member id', 'subscriber id')),
+    ('provider_id', ('provider id',)),
+    ('npi', ('npi number',)),
+    ('medical_license', ('medical license', 'license number')),
+    ('dea', ('dea number',)),
+    ('birth_date', ('date of birth', 'dob', 'birth')),
+    ('credit_card', ('credit card',)),
+    ('aadhaar', ('ssn', 'social security', 'aadhaar')),
+    ('passport', ('passport',)),
+    ('driver_license', ('driver license', 'driving licence')),
+)
+# Each alternative is anchored with a lazy '.*?' so they're tried in rule
+# order (not leftmost-occurrence order); lastgroup names the winning rule.
+LABEL_DISPATCH_RE = re.compile('|'.join(
+    f".*?(?P<{rule}>{'|'.join(map(re.escape, keywords))})" for rule, keywords in FAKE_VALUE_RULES
+), re.DOTALL)
+
+# Rules whose fake value is just a formatted random integer in [low, high].
+# Single values use _fake_id; list values are generated with one NumPy draw.
+BULK_ID_FORMATS = {
+    'phone': ('+91-{}', 6000000000, 9999999999),
+    'hospital_id': ('HOSP-{}', 1000000, 9999999),
+    'patient_id': ('PAT-{}', 100000, 999999),
+    'mrn': ('MRN{}', 100000, 9999999),
+    'policy': ('POL-{}', 10000000, 99999999),
+    'member_id': ('MEM-{}', 1000000, 9999999),
+    'aadhaar': ('{:012d}', 0, 999999999999),
+}
 
 class SimplePIIFaker:
     """
@@ -15,16 +78,37 @@ class SimplePIIFaker:
     def __init__(self, locale: str = 'en_IN'):
         # Initialize with Indian locale for authentic data
         self.faker = Faker(locale)
+        # Bind the Faker methods used below once; each self.faker.<attr> lookup
+        # otherwise goes through Faker's locale proxy
+        self._name = self.faker.name
+        self._name_male = self.faker.name_male
+        self._name_female = self.faker.name_female
+        self._email = self.faker.email
+        self._address = self.faker.address
+        self._random_int = self.faker.random_int
+        self._random_letters = self.faker.random_letters
+        self._random_letter = self.faker.random_letter
+        self._date_of_birth = self.faker.date_of_birth
         self.replacement_cache = {}
         self.current_patient_name = None
+        self._fake_handlers = {rule: getattr(self, f'_fake_{rule}') for rule, _ in FAKE_VALUE_RULES}
+        self._fake_handlers['other'] = self._fake_other
+        # label -> rule, so each distinct label is lower-cased and matched once
+        self._label_routes = {}
+        self._rng = np.random.default_rng()
 
     def _generate_aadhaar(self) -> str:
         """Generate Aadhaar-like 12-digit number"""
-        return ''.join(str(random.randint(0, 9)) for _ in range(12))
+        return self._fake_id('aadhaar')
+
+    def _fake_id(self, rule: str) -> str:
+        """Generate one value in the BULK_ID_FORMATS shape for rule"""
+        template, low, high = BULK_ID_FORMATS[rule]
+        return template.format(random.randint(low, high))
 
     def _clean_for_email(self, name_part: str) -> str:
         """Clean name parts for email generation"""
-        return re.sub(r'[^a-z]', '', name_part.lower())
+        return NON_LOWER_ALPHA_RE.sub('', name_part.lower())
 
     def generate_fake_value(self, label: str, original_value: str) -> str:
         """Generate fake value based on PII label using Indian data"""
@@ -34,132 +118,145 @@ class SimplePIIFaker:
         if cache_key in self.replacement_cache:
             return self.replacement_cache[cache_key]
 
-        label_lower = label.lower()
-        fake_value = ""
-
-        # PERSONAL NAMES & DOCTOR HANDLING
-        if 'patient name' in label_lower or 'name' in label_lower:
-            if any(title in original_value.lower() for title in ['mr.', 'mr', 'shri', 'sri']):
-                fake_value = self.faker.name_male()
-            elif any(title in original_value.lower() for title in ['mrs.', 'ms.', 'miss', 'smt', 'dr.']):
-                if 'dr.' in original_value.lower():
-                    fake_value = f"Dr. {self.faker.name()}"
-                else:
-                    fake_value = self.faker.name_female()
-            else:
-                fake_value = self.faker.name()
-
-            # Store patient name for email generation
-            if 'patient name' in label_lower or label_lower == 'name':
-                self.current_patient_name = fake_value
-
-        # DOCTOR / PRIMARY DOCTOR
-        elif 'doctor' in label_lower or 'primary doctor' in label_lower or 'physician' in label_lower:
-            specialties = ['Cardiologist', 'Neurologist', 'Orthopedist', 'Dermatologist', 'Pediatrician']
-            name = self.faker.name()
-            specialty = random.choice(specialties)
-            fake_value = f"Dr. {name}, {specialty}"
-
-        # EMAIL GENERATION - Use patient name for consistency
-        elif 'email' in label_lower:
-            if self.current_patient_name:
-                name_parts = self.current_patient_name.lower().replace('dr. ', '').split()
-                if len(name_parts) >= 2:
-                    first_name = self._clean_for_email(name_parts[0])
-                    last_name = self._clean_for_email(name_parts[-1])
-                    domain_options = ['example.com', 'example.org', 'test.com', 'sample.org', 'demo.net']
-                    domain = random.choice(domain_options)
-                    fake_value = f"{first_name}.{last_name}@{domain}"
-                else:
-                    clean_name = self._clean_for_email(name_parts[0])
-                    domain = random.choice(['example.com', 'example.org', 'test.com'])
-                    fake_value = f"{clean_name}@{domain}"
+        fake_value = self._fake_handlers[self._route(label)](label, original_value)
+
+        # Cache and return
+        self.replacement_cache[cache_key] = fake_value
+        return fake_value
+
+    def _route(self, label: str) -> str:
+        """Return the FAKE_VALUE_RULES rule for a label ('other' if none matches)"""
+        rule = self._label_routes.get(label)
+        if rule is None:
+            # One regex match picks the first rule whose keyword occurs in the label
+            match = LABEL_DISPATCH_RE.match(label.lower())
+            rule = self._label_routes[label] = match.lastgroup if match else 'other'
+        return rule
+
+    def generate_fake_values(self, label: str, original_values: List[str]) -> List[str]:
+        """Generate fake values for a list of originals, drawing ID-shaped values in bulk"""
+        bulk_format = BULK_ID_FORMATS.get(self._route(label))
+        if bulk_format is None or len(original_values) < 2:
+            return [self.generate_fake_value(label, v) for v in original_values]
+
+        # Same cache as generate_fake_value, so repeated originals stay consistent
+        cache_keys = [f"{label}:{v}" for v in original_values]
+        missing = [key for key in dict.fromkeys(cache_keys) if key not in self.replacement_cache]
+        if missing:
+            template, low, high = bulk_format
+            numbers = self._rng.integers(low, high, size=len(missing), endpoint=True).tolist()
+            for key, number in zip(missing, numbers):
+                self.replacement_cache[key] = template.format(number)
+
+        return [self.replacement_cache[key] for key in cache_keys]
+
+    # PERSONAL NAMES & DOCTOR HANDLING
+    def _fake_name(self, label: str, original_value: str) -> str:
+        original_lower = original_value.lower()
+        if any(title in original_lower for title in ['mr.', 'mr', 'shri', 'sri']):
+            fake_value = self._name_male()
+        elif any(title in original_lower for title in ['mrs.', 'ms.', 'miss', 'smt', 'dr.']):
+            if 'dr.' in original_lower:
+                fake_value = f"Dr. {self._name()}"
             else:
-                fake_value = self.faker.email()
+                fake_value = self._name_female()
+        else:
+            fake_value = self._name()
 
-        # CONTACT INFORMATION
-        elif 'phone number' in label_lower or 'mobile number' in label_lower:
-            # Generate valid Indian mobile number
-            fake_value = "+91-" + str(random.randint(6000000000, 9999999999))
+        # Store patient name for email generation
+        label_lower = label.lower()
+        if 'patient name' in label_lower or label_lower == 'name':
+            self.current_patient_name = fake_value
+        return fake_value
 
-        elif 'address' in label_lower or 'location' in label_lower:
-            # Generate Indian address
-            fake_value = self.faker.address().replace("\n", ", ")
+    # DOCTOR / PRIMARY DOCTOR
+    def _fake_doctor(self, label: str, original_value: str) -> str:
+        name = self._name()
+        specialty = random.choice(DOCTOR_SPECIALTIES)
+        return f"Dr. {name}, {specialty}"
 
-        # MEDICAL IDENTIFIERS
-        elif 'hospital id' in label_lower:
-            fake_value = f"HOSP-{random.randint(1000000, 9999999)}"
+    # EMAIL GENERATION - Use patient name for consistency
+    def _fake_email(self, label: str, original_value: str) -> str:
+        if not self.current_patient_name:
+            return self._email()
 
-        elif 'patient id' in label_lower:
-            fake_value = f"PAT-{random.randint(100000, 999999)}"
+        name_parts = self.current_patient_name.lower().replace('dr. ', '').split()
+        if len(name_parts) >= 2:
+            first_name = self._clean_for_email(name_parts[0])
+            last_name = self._clean_for_email(name_parts[-1])
+            domain = random.choice(EMAIL_DOMAINS)
+            return f"{first_name}.{last_name}@{domain}"
 
-        elif 'medical record number' in label_lower or 'mrn' in label_lower:
-            fake_value = f"MRN{random.randint(100000, 9999999)}"
+        clean_name = self._clean_for_email(name_parts[0])
+        domain = random.choice(EMAIL_DOMAINS[:3])
+        return f"{clean_name}@{domain}"
 
-        elif 'insurance id' in label_lower or 'policy number' in label_lower:
-            fake_value = f"POL-{random.randint(10000000, 99999999)}"
+    # CONTACT INFORMATION
+    def _fake_phone(self, label: str, original_value: str) -> str:
+        # Generate valid Indian mobile number
+        return self._fake_id('phone')
 
-        elif 'member id' in label_lower or 'subscriber id' in label_lower:
-            fake_value = f"MEM-{random.randint(1000000, 9999999)}"
+    def _fake_address(self, label: str, original_value: str) -> str:
+        # Generate Indian address
+        return self._address().replace("\n", ", ")
 
-        elif 'provider id' in label_lower:
-            fake_value = f"PROV-{self.faker.random_int(min=1000, max=9999)}"
+    # MEDICAL IDENTIFIERS
+    def _fake_hospital_id(self, label: str, original_value: str) -> str:
+        return self._fake_id('hospital_id')
 
-        elif 'npi number' in label_lower:
-            fake_value = str(self.faker.random_int(min=1000000000, max=9999999999))
+    def _fake_patient_id(self, label: str, original_value: str) -> str:
+        return self._fake_id('patient_id')
 
-        elif 'medical license' in label_lower or 'license number' in label_lower:
-            state_codes = ['MH', 'DL', 'KA', 'TN', 'UP', 'GJ', 'RJ', 'WB', 'AP', 'MP']
-            state_code = random.choice(state_codes)
-            fake_value = f"{state_code}MED{self.faker.random_int(min=10000, max=99999)}"
+    def _fake_mrn(self, label: str, original_value: str) -> str:
+        return self._fake_id('mrn')
 
-        elif 'dea number' in label_lower:
-            letters = ''.join(self.faker.random_letters(length=2)).upper()
-            numbers = str(self.faker.random_int(min=1000000, max=9999999))
-            fake_value = f"{letters}{numbers}"
+    def _fake_policy(self, label: str, original_value: str) -> str:
+        return self._fake_id('policy')
 
-        # PERSONAL INFORMATION
-        elif 'date of birth' in label_lower or 'dob' in label_lower or 'birth' in label_lower:
-            fake_date = self.faker.date_of_birth(minimum_age=18, maximum_age=75)
-            fake_value = fake_date.strftime('%d %B %Y')
+    def _fake_member_id(self, label: str, original_value: str) -> str:
+        return self._fake_id('member_id')
 
-        elif 'credit card' in label_lower:
-            fake_value = f"****-****-****-{self.faker.random_int(min=1000, max=9999)}"
+    def _fake_provider_id(self, label: str, original_value: str) -> str:
+        return f"PROV-{self._random_int(min=1000, max=9999)}"
 
-        elif 'ssn' in label_lower or 'social security' in label_lower or 'aadhaar' in label_lower:
-            fake_value = self._generate_aadhaar()
+    def _fake_npi(self, label: str, original_value: str) -> str:
+        return str(self._random_int(min=1000000000, max=9999999999))
 
-        elif 'passport' in label_lower:
-            fake_value = f"{self.faker.random_letter().upper()}{self.faker.random_int(min=1000000, max=9999999)}"
+    def _fake_medical_license(self, label: str, original_value: str) -> str:
+        state_code = random.choice(MEDICAL_LICENSE_STATES)
+        return f"{state_code}MED{self._random_int(min=10000, max=99999)}"
 
-        elif 'driver license' in label_lower or 'driving licence' in label_lower:
-            state_codes = ['DL', 'MH', 'KA', 'TN', 'UP', 'GJ', 'RJ']
-            state = random.choice(state_codes)
-            fake_value = f"{state}{self.faker.random_int(min=10000000000, max=99999999999)}"
+    def _fake_dea(self, label: str, original_value: str) -> str:
+        letters = ''.join(self._random_letters(length=2)).upper()
+        numbers = str(self._random_int(min=1000000, max=9999999))
+        return f"{letters}{numbers}"
 
+    # PERSONAL INFORMATION
+    def _fake_birth_date(self, label: str, original_value: str) -> str:
+        fake_date = self._date_of_birth(minimum_age=18, maximum_age=75)
+        return fake_date.strftime('%d %B %Y')
+
+    def _fake_credit_card(self, label: str, original_value: str) -> str:
+        return f"****-****-****-{self._random_int(min=1000, max=9999)}"
+
+    def _fake_aadhaar(self, label: str, original_value: str) -> str:
+        return self._generate_aadhaar()
+
+    def _fake_passport(self, label: str, original_value: str) -> str:
+        return f"{self._random_letter().upper()}{self._random_int(min=1000000, max=9999999)}"
+
+    def _fake_driver_license(self, label: str, original_value: str) -> str:
+        state = random.choice(DRIVER_LICENSE_STATES)
+        return f"{state}{self._random_int(min=10000000000, max=99999999999)}"
+
+    def _fake_other(self, label: str, original_value: str) -> str:
         # INSURANCE INFORMATION
-        elif any(word in str(original_value).lower() for word in ['insurance', 'assurance', 'life', 'general', 'health', 'medical']):
-            insurance_names = [
-                'Apollo Munich Health Insurance',
-                'HDFC Life Insurance',
-                'Max Life Insurance', 
-                'SBI Life Insurance',
-                'ICICI Prudential Life Insurance',
-                'Bajaj Allianz Life Insurance',
-                'LIC of India',
-                'Star Health Insurance',
-                'New India Assurance'
-            ]
-            fake_value = random.choice(insurance_names)
+        if any(word in str(original_value).lower() for word in INSURANCE_KEYWORDS):
+            return random.choice(INSURANCE_NAMES)
 
         # GENERIC FALLBACK
-        else:
-            safe_label = re.sub(r'[^A-Z0-9_]', '_', label.upper().replace(' ', '_'))
-            fake_value = f"[FAKE_{safe_label}]"
-
-        # Cache and return
-        self.replacement_cache[cache_key] = fake_value
-        return fake_value
+        safe_label = NON_LABEL_CHAR_RE.sub('_', label.upper().replace(' ', '_'))
+        return f"[FAKE_{safe_label}]"
 
     def replace_pii_json(self, pii_json: Dict[str, Union[str, List[str]]]) -> Dict[str, Union[str, List[str]]]:
         """
@@ -169,41 +266,35 @@ class SimplePIIFaker:
         self.current_patient_name = None
         fake_json: Dict[str, Union[str, List[str]]] = {}
 
-        # First pass: try to find patient name
-        for label, value in pii_json.items():
-            label_lower = label.lower()
-            if 'patient name' in label_lower or label_lower == 'name':
-                if isinstance(value, list):
-                    fake_json[label] = [self.generate_fake_value(label, v) for v in value]
-                else:
-                    fake_json[label] = self.generate_fake_value(label, value)
-
-                # Set current patient name for email generation
-                if isinstance(fake_json[label], str):
-                    self.current_patient_name = fake_json[label]
-                elif isinstance(fake_json[label], list) and len(fake_json[label]) > 0:
-                    self.current_patient_name = fake_json[label][0]
-                break
-
-        # Process remaining keys
-        for label, value in pii_json.items():
-            label_lower = label.lower()
-
-            # Skip already processed patient name
-            if ('patient name' in label_lower or label_lower == 'name') and label in fake_json:
-                continue
+        # Move the patient name label to the front so email generation can use it
+        labels = list(pii_json)
+        name_label = next((label for label in labels
+                           if 'patient name' in label.lower() or label.lower() == 'name'), None)
+        if name_label is not None:
+            labels.remove(name_label)
+            labels.insert(0, name_label)
 
+        for label in labels:
+            value = pii_json[label]
             if isinstance(value, list):
-                fake_json[label] = [self.generate_fake_value(label, v) for v in value]
+                fake_json[label] = self.generate_fake_values(label, value)
             else:
                 fake_json[label] = self.generate_fake_value(label, value)
 
+            # Set current patient name for email generation
+            if label == name_label:
+                fake_name = fake_json[label]
+                if isinstance(fake_name, str):
+                    self.current_patient_name = fake_name
+                elif fake_name:
+                    self.current_patient_name = fake_name[0]
+
         return fake_json
 
     def save_fake_json(self, fake_data: Dict, output_file: str = "fake_pii_output.json") -> str:
         """Save fake data to JSON file"""
-        with open(output_file, 'w', encoding='utf-8') as f:
-            json.dump(fake_data, f, indent=2, ensure_ascii=False)
+        with open(output_file, 'wb') as f:
+            f.write(orjson.dumps(fake_data, option=orjson.OPT_INDENT_2))
         return output_file
 
     def get_comparison_dict(self, original: Dict, fake: Dict) -> Dict:
@@ -224,7 +315,9 @@ def process(input_file: str):
     """
     print(f"📄 Running PII Detector + Faker pipeline on: {input_file}")
 
-    detector = CleanPIIDetector()
+    # Imported here so the faker can be used without the detector's model stack
+    from pii_detector import get_detector
+    detector = get_detector()
     detected_pii = detector.extract_pii_from_file(input_file)
 
     if "error" in detected_pii:
@@ -235,7 +328,7 @@ def process(input_file: str):
     fake_pii = faker.replace_pii_json(detected_pii)
 
     print("\n🎭 Fake PII JSON:")
-    print(json.dumps(fake_pii, indent=2, ensure_ascii=False))
+    print(orjson.dumps(fake_pii, option=orjson.OPT_INDENT_2).decode('utf-8'))
 
     return {
         "success": True,
@@ -0,0 +1,113 @@
+import importlib
+import io
+import os
+import sys
+
+import pandas as pd
+import pytest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+
+@pytest.fixture(scope='module')
+def app_module(tmp_path_factory):
+    # app creates its excel_data/ storage relative to the working directory on import
+    cwd = os.getcwd()
+    os.chdir(tmp_path_factory.mktemp('storage'))
+    try:
+        yield importlib.import_module('app')
+    finally:
+        os.chdir(cwd)
+
+
+@pytest.fixture(scope='module')
+def client(app_module):
+    return app_module.app.test_client()
+
+
+def test_download_xlsx_with_list_value(client):
+    row = {
+        'filename': 'report.pdf',
+        'Patient_Name': ['John Doe', 'Jane Doe'],
+        'Hospital_ID': 'HOSP-1234567',
+    }
+
+    response = client.post('/api/download-results', json={'piiPhiData': [row]})
+
+    assert response.status_code == 200
+    data = pd.read_excel(io.BytesIO(response.data), sheet_name='PII_PHI_Data')
+    assert data.loc[0, 'filename'] == 'report.pdf'
+    assert data.loc[0, 'Patient_Name'] == 'John Doe, Jane Doe'
+
+
+def test_download_csv_quotes_formula_cells(client):
+    row = {
+        'filename': '=HYPERLINK("http://example.com")',
+        'Patient_Name': ['John Doe', '@Jane Doe'],
+        'Hospital_ID': '-1234567',
+    }
+
+    response = client.post('/api/download-results?format=csv', json={'piiPhiData': [row]})
+
+    assert response.status_code == 200
+    data = pd.read_csv(io.BytesIO(response.data), dtype=str, keep_default_na=False)
+    assert data.loc[0, 'filename'] == '\'=HYPERLINK("http://example.com")'
+    assert data.loc[0, 'Patient_Name'] == 'John Doe, @Jane Doe'
+    assert data.loc[0, 'Hospital_ID'] == "'-1234567"
+
+
+def test_download_csv_matches_xlsx(client):
+    rows = [
+        {'filename': 'a.pdf', 'Patient_Name': ['John Doe', 'Jane Doe'], 'Hospital_ID': 'HOSP-1234567'},
+        {'filename': 'b.pdf', 'Patient_Name': 'Asha Rao', 'Policy_Number': ['POL-1', 'POL-2']},
+    ]
+
+    xlsx = client.post('/api/download-results', json={'piiPhiData': rows})
+    csv = client.post('/api/download-results?format=csv', json={'piiPhiData': rows})
+
+    assert xlsx.status_code == csv.status_code == 200
+    xlsx_data = pd.read_excel(io.BytesIO(xlsx.data), sheet_name='PII_PHI_Data', dtype=str, keep_default_na=False)
+    csv_data = pd.read_csv(io.BytesIO(csv.data), dtype=str, keep_default_na=False)
+    pd.testing.assert_frame_equal(csv_data, xlsx_data)
+    assert csv_data.loc[1, 'Policy_Number'] == 'POL-1, POL-2'
+
+
+def test_append_then_read_rows_through_cache(app_module):
+    path = os.path.join(app_module.EXCEL_DATA_DIR, 'roundtrip.xlsx')
+    app_module.write_excel_data(pd.DataFrame({'user_id': ['u1'], 'value': ['first']}), path)
+
+    # Prime the cache and its user_id index before the append
+    assert app_module.read_excel_rows(path, 'user_id', 'u1')['value'].tolist() == ['first']
+
+    assert app_module.append_excel_rows(path, [{'user_id': 'u1', 'value': 'second'},
+                                               {'user_id': 'u2', 'value': 'other'}])
+
+    assert app_module.read_excel_rows(path, 'user_id', 'u1')['value'].tolist() == ['first', 'second']
+    assert app_module.read_excel_rows(path, 'user_id', 'u2')['value'].tolist() == ['other']
+
+
+def test_redactions_history_returns_only_callers_rows(app_module, client):
+    app_module.append_jsonl_rows(app_module.REDACTIONS_LOG_JSONL, [
+        {'id': 'r1', 'session_id': 's1', 'user_id': 'alice', 'filename': 'a.pdf', 'processed_at': '2024-01-01'},
+        {'id': 'r2', 'session_id': 's2', 'user_id': 'bob', 'filename': 'b.pdf', 'processed_at': '2024-01-02'},
+        {'id': 'r3', 'session_id': 's3', 'user_id': 'alice', 'filename': 'c.pdf', 'processed_at': '2024-01-03'},
+    ])
+
+    response = client.get('/api/redactions-history/alice')
+
+    assert response.status_code == 200
+    assert [record['id'] for record in response.get_json()['history']] == ['r1', 'r3']
+
+
+def test_login_cache_rejects_changed_password(app_module, client):
+    credentials = {'email': 'nurse@example.com', 'password': 'old-password'}
+    assert client.post('/register', json={'name': 'Nurse', **credentials}).status_code == 200
+    # Successful login leaves the old password in the login cache
+    assert client.post('/login', json=credentials).status_code == 200
+
+    users = app_module.read_excel_data(app_module.USERS_EXCEL)
+    users.loc[users['email'] == credentials['email'], 'password_hash'] = app_module.hash_password('new-password')
+    app_module.write_excel_data(users, app_module.USERS_EXCEL)
+
+    assert client.post('/login', json=credentials).status_code == 401
+    assert client.post('/login', json={**credentials, 'password': 'new-password'}).status_code == 200
@@ -0,0 +1,92 @@
+import os
+import re
+import sys
+
+import pytest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from replacer import SimplePIIFaker
+
+
+# Rule the original if/elif chain in generate_fake_value picked for each label
+@pytest.mark.parametrize('label, rule', [
+    ('patient name', 'name'),
+    ('Patient Name', 'name'),
+    ('name', 'name'),
+    ('Emergency Name', 'name'),
+    ('doctor name', 'name'),
+    ('username', 'name'),
+    ('Primary Doctor', 'doctor'),
+    ('Physician', 'doctor'),
+    ('Doctor email', 'doctor'),
+    ('email', 'email'),
+    ('email address', 'email'),
+    ('phone number', 'phone'),
+    ('mobile number', 'phone'),
+    ('Address', 'address'),
+    ('location', 'address'),
+    ('ip address', 'address'),
+    ('hospital id', 'hospital_id'),
+    ('patient id', 'patient_id'),
+    ('Medical Record Number', 'mrn'),
+    ('mrn', 'mrn'),
+    ('Insurance ID', 'policy'),
+    ('Policy Number', 'policy'),
+    ('member id', 'member_id'),
+    ('subscriber id', 'member_id'),
+    ('Provider ID', 'provider_id'),
+    ('NPI Number', 'npi'),
+    ('Medical License', 'medical_license'),
+    ('license number', 'medical_license'),
+    ('driver license number', 'medical_license'),
+    ('DEA Number', 'dea'),
+    ('date of birth', 'birth_date'),
+    ('dob', 'birth_date'),
+    ('credit card', 'credit_card'),
+    ('social security number', 'aadhaar'),
+    ('ssn', 'aadhaar'),
+    ('aadhaar', 'aadhaar'),
+    ('passport number', 'passport'),
+    ('driver license', 'driver_license'),
+    ('driving licence', 'driver_license'),
+    ('password', 'other'),
+    ('nurse', 'other'),
+    ('medical insurance', 'other'),
+    ('unknown xyz', 'other'),
+])
+def test_label_routing_matches_original_chain(label, rule):
+    assert SimplePIIFaker()._route(label) == rule
+
+
+# Shape every fake value for a BULK_ID_FORMATS rule must have
+ID_FORMAT_RES = {
+    'phone': r'\+91-[6-9]\d{9}',
+    'hospital_id': r'HOSP-\d{7}',
+    'patient_id': r'PAT-\d{6}',
+    'mrn': r'MRN\d{6,7}',
+    'policy': r'POL-\d{8}',
+    'member_id': r'MEM-\d{7}',
+    'aadhaar': r'\d{12}',
+}
+
+
+@pytest.mark.parametrize('label, rule', [
+    ('phone number', 'phone'),
+    ('hospital id', 'hospital_id'),
+    ('patient id', 'patient_id'),
+    ('mrn', 'mrn'),
+    ('policy number', 'policy'),
+    ('member id', 'member_id'),
+    ('aadhaar', 'aadhaar'),
+])
+def test_single_and_bulk_ids_share_format(label, rule):
+    faker = SimplePIIFaker()
+    assert faker._route(label) == rule
+    pattern = re.compile(ID_FORMAT_RES[rule])
+
+    singles = [faker.generate_fake_value(label, f'single-{i}') for i in range(20)]
+    bulk = faker.generate_fake_values(label, [f'bulk-{i}' for i in range(20)])
+
+    for value in singles + bulk:
+        assert pattern.fullmatch(value), value